@@ -4,9 +4,9 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from app.models import User, Post
-from app.database import Base
-from app.config import settings
+from app.database import models
+from app.database.database import Base
+from app.core.config import config as settings
 
 database_url = settings.database_url
 
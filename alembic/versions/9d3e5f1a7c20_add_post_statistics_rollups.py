@@ -0,0 +1,44 @@
+"""add post statistics rollup tables maintained by triggers on posts
+
+Revision ID: 9d3e5f1a7c20
+Revises: e7a94b1d3c62
+Create Date: 2026-10-19 16:41:09.731254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database.post_stats import drop_post_stats_triggers, install_post_stats_triggers, rebuild_post_stats
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e5f1a7c20'
+down_revision: Union[str, None] = 'e7a94b1d3c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('post_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('published', sa.Boolean(), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('post_count', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'published', 'slot')
+    )
+    op.create_table('post_stats_totals',
+    sa.Column('published', sa.Boolean(), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('post_count', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('published', 'slot')
+    )
+    connection = op.get_bind()
+    install_post_stats_triggers(connection)
+    rebuild_post_stats(connection)
+
+
+def downgrade() -> None:
+    drop_post_stats_triggers(op.get_bind())
+    op.drop_table('post_stats_totals')
+    op.drop_table('post_daily_stats')
@@ -0,0 +1,74 @@
+"""range partition posts by month on created_at
+
+Revision ID: b5d20c7e41f8
+Revises: 3c1f6e2a9b47
+Create Date: 2026-10-19 11:03:27.918342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database.partitions import ensure_post_partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d20c7e41f8'
+down_revision: Union[str, None] = '3c1f6e2a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    has_posts = sa.inspect(connection).has_table('posts')
+    if has_posts:
+        op.rename_table('posts', 'posts_unpartitioned')
+        op.execute('ALTER TABLE posts_unpartitioned RENAME CONSTRAINT posts_pkey TO posts_unpartitioned_pkey')
+        op.execute('ALTER SEQUENCE posts_id_seq OWNED BY NONE')
+    else:
+        op.execute('CREATE SEQUENCE posts_id_seq AS integer')
+
+    # The primary key of a partitioned table has to include the partition key
+    op.execute("""
+        CREATE TABLE posts (
+            id INTEGER NOT NULL DEFAULT nextval('posts_id_seq'),
+            title VARCHAR NOT NULL,
+            content VARCHAR NOT NULL,
+            published BOOLEAN DEFAULT 'True' NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+            CONSTRAINT posts_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('ALTER SEQUENCE posts_id_seq OWNED BY posts.id')
+
+    oldest = None
+    if has_posts:
+        oldest = connection.execute(sa.text('SELECT min(created_at) FROM posts_unpartitioned')).scalar()
+    ensure_post_partitions(connection, from_month=oldest)
+
+    if has_posts:
+        op.execute('INSERT INTO posts (id, title, content, published, created_at) '
+                   'SELECT id, title, content, published, created_at FROM posts_unpartitioned')
+        op.drop_table('posts_unpartitioned')
+
+
+def downgrade() -> None:
+    op.execute('ALTER SEQUENCE posts_id_seq OWNED BY NONE')
+    op.rename_table('posts', 'posts_partitioned')
+    op.execute('ALTER TABLE posts_partitioned RENAME CONSTRAINT posts_pkey TO posts_partitioned_pkey')
+    op.execute("""
+        CREATE TABLE posts (
+            id INTEGER NOT NULL DEFAULT nextval('posts_id_seq'),
+            title VARCHAR NOT NULL,
+            content VARCHAR NOT NULL,
+            published BOOLEAN DEFAULT 'True' NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+            CONSTRAINT posts_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE posts_id_seq OWNED BY posts.id')
+    op.execute('INSERT INTO posts (id, title, content, published, created_at) '
+               'SELECT id, title, content, published, created_at FROM posts_partitioned')
+    # dropping the parent drops every attached partition with it
+    op.drop_table('posts_partitioned')
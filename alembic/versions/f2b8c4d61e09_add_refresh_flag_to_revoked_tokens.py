@@ -0,0 +1,28 @@
+"""add refresh flag to revoked_tokens so workers only mirror access token revocations
+
+Revision ID: f2b8c4d61e09
+Revises: 9d3e5f1a7c20
+Create Date: 2026-10-19 21:04:12.730419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8c4d61e09'
+down_revision: Union[str, None] = '9d3e5f1a7c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing rows count as access token revocations, so they stay mirrored until they expire
+    op.add_column('revoked_tokens',
+                  sa.Column('refresh', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('revoked_tokens', 'refresh')
@@ -0,0 +1,215 @@
+"""Bulk import and export of posts and users using Postgres COPY.
+
+Files are streamed in chunks, so memory use does not depend on the file size. Imported rows are validated with the
+same models the API uses, and user passwords are hashed in parallel across all cores.
+
+Usage:
+    python -m app.cli.bulk import posts posts.csv
+    python -m app.cli.bulk import users users.ndjson --workers 8
+    python -m app.cli.bulk export posts posts.ndjson
+    python -m app.cli.bulk export users users.csv --with-timestamps
+
+An import runs in a single transaction: it is either fully applied or not at all. Posts imported with their
+timestamps get the monthly partitions covering them created (and committed) first, so they do not pile up in the
+default partition.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.database.database import engine
+from app.database.partitions import add_months, ensure_post_partitions, month_start
+from app.schemas.post_model import PostModel
+from app.schemas.user_model import UserCreateModel
+from app.service.invalidation_bus import invalidation_bus
+from app.utils import password_util
+
+
+@dataclass(frozen=True)
+class BulkTable:
+    name: str
+    model: Type[BaseModel]
+    columns: Tuple[str, ...]
+    # name of the workers' cache of this table on the invalidation bus
+    cache_entity: str
+
+
+TABLES = {
+    "posts": BulkTable(name="posts", model=PostModel, columns=("title", "content", "published"), cache_entity="post"),
+    "users": BulkTable(name="users", model=UserCreateModel, columns=("firstname", "lastname", "email", "password"),
+                       cache_entity="user"),
+}
+
+
+class BulkImportError(Exception):
+    """Raised when a row in the input file fails validation."""
+
+
+def detect_format(path: str, file_format: str | None) -> str:
+    if file_format:
+        return file_format
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def read_records(stream: io.TextIOBase, file_format: str) -> Iterator[dict]:
+    """Yields one dict per row of a csv (with a header line) or ndjson stream."""
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def chunked(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def validate_chunk(table: BulkTable, records: List[dict], first_row: int, with_timestamps: bool,
+                   skip_invalid: bool) -> List[list]:
+    """Validates a chunk of records and returns them as lists of column values in COPY order."""
+    rows = []
+    for row_number, record in enumerate(records, start=first_row):
+        try:
+            values = table.model.model_validate(record).model_dump()
+            row = [values[column] for column in table.columns]
+            if with_timestamps:
+                row.append(datetime.fromisoformat(record["created_at"]).isoformat())
+            rows.append(row)
+        except (ValidationError, KeyError, TypeError, ValueError) as e:
+            if not skip_invalid:
+                raise BulkImportError(f"Row {row_number} is invalid: {e}")
+            logging.warning(f"Skipping invalid row {row_number}: {e}")
+    return rows
+
+
+def to_copy_buffer(rows: List[list]) -> io.StringIO:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+def ensure_partitions_for(rows: List[list], covered: set[date]) -> None:
+    """Creates the monthly posts partitions for the created_at values (the last column) of `rows`.
+    They are created and committed on their own connection, so the import transaction never holds the locks taken
+    to create them (empty partitions left behind by an import that rolls back are harmless).
+    """
+    months = {month_start(datetime.fromisoformat(row[-1])) for row in rows}
+    if not months or months <= covered:
+        return
+    # one month of margin either way, timestamps without an offset are read in the session's time zone
+    first, last = add_months(min(months), -1), add_months(max(months), 1)
+    with engine.begin() as connection:
+        ensure_post_partitions(connection, from_month=first, to_month=last)
+    month = first
+    while month <= last:
+        covered.add(month)
+        month = add_months(month, 1)
+
+
+def report(action: str, count: int, started_at: float) -> None:
+    elapsed = time.perf_counter() - started_at
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"{action} {count} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+def import_table(table: BulkTable, path: str, file_format: str, chunk_size: int, workers: int,
+                 with_timestamps: bool, skip_invalid: bool, prehashed: bool) -> int:
+    columns = table.columns + (("created_at",) if with_timestamps else ())
+    copy_sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    hash_passwords = table.name == "users" and not prehashed
+    password_index = table.columns.index("password") if hash_passwords else None
+    partitioned_by_created_at = table.name == "posts" and with_timestamps
+    covered_months: set[date] = set()
+
+    imported = 0
+    started_at = time.perf_counter()
+    with engine.begin() as connection, open(path, newline="", encoding="utf-8") as stream, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        cursor = connection.connection.cursor()
+        try:
+            for chunk_number, records in enumerate(chunked(read_records(stream, file_format), chunk_size)):
+                rows = validate_chunk(table, records, chunk_number * chunk_size + 1, with_timestamps, skip_invalid)
+                if hash_passwords:
+                    hashes = pool.map(password_util.hash_password, (row[password_index] for row in rows),
+                                      chunksize=max(1, len(rows) // (workers * 4)))
+                    for row, hashed_password in zip(rows, hashes):
+                        row[password_index] = hashed_password
+                if partitioned_by_created_at:
+                    ensure_partitions_for(rows, covered_months)
+                cursor.copy_expert(copy_sql, to_copy_buffer(rows))
+                imported += len(rows)
+                report("Imported", imported, started_at)
+        finally:
+            cursor.close()
+        # delivered on commit, so the workers drop anything they cached from before the import
+        invalidation_bus.publish_clear(connection, table.cache_entity)
+    return imported
+
+
+def export_table(table: BulkTable, path: str, file_format: str, with_timestamps: bool) -> int:
+    columns = ("id",) + table.columns + (("created_at",) if with_timestamps else ())
+    query = f"SELECT {', '.join(columns)} FROM {table.name} ORDER BY id"
+    if file_format == "csv":
+        copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    else:
+        # Quote and delimiter characters that never occur in json output, so each json document is written verbatim
+        copy_sql = f"COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT WITH (FORMAT csv, QUOTE e'\\x01', " \
+                   f"DELIMITER e'\\x02')"
+
+    connection = engine.raw_connection()
+    started_at = time.perf_counter()
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as stream, connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, stream)
+            exported = cursor.rowcount
+        connection.rollback()
+    finally:
+        connection.close()
+    report("Exported", exported, started_at)
+    return exported
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="csv or ndjson file to read from or write to")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows validated and copied at a time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes used to hash passwords")
+    parser.add_argument("--with-timestamps", action="store_true", help="import/export the created_at column too")
+    parser.add_argument("--skip-invalid", action="store_true", help="skip invalid rows instead of aborting")
+    parser.add_argument("--prehashed", action="store_true",
+                        help="user passwords in the file are already hashed (e.g. from an export)")
+    args = parser.parse_args(argv)
+
+    table = TABLES[args.table]
+    file_format = detect_format(args.path, args.format)
+    try:
+        if args.action == "import":
+            import_table(table, args.path, file_format, args.chunk_size, args.workers, args.with_timestamps,
+                         args.skip_invalid, args.prehashed)
+        else:
+            export_table(table, args.path, file_format, args.with_timestamps)
+    except BulkImportError as e:
+        parser.exit(1, f"Import aborted, nothing was written: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
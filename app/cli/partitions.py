@@ -0,0 +1,79 @@
+"""Maintenance of the monthly partitions of the posts table.
+
+Usage:
+    python -m app.cli.partitions ensure [--months-ahead 3]
+    python -m app.cli.partitions archive --older-than-months 12 [--schema archive | --drop]
+
+`archive` detaches every monthly partition that ends before the cutoff. Detached partitions are moved to the archive
+schema, where they can still be queried or dumped, or dropped with --drop. Either way they no longer take part in
+queries or vacuum of the posts table, nor in the post statistics.
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.database.database import engine
+from app.database.partitions import (
+    POSTS_TABLE,
+    MONTHS_AHEAD,
+    add_months,
+    ensure_post_partitions,
+    month_start,
+    monthly_partitions,
+    partition_name
+)
+from app.database.post_stats import forget_post_stats
+from app.service.invalidation_bus import invalidation_bus
+
+
+def archive_partitions(older_than_months: int, schema: str, drop: bool) -> list[str]:
+    """Detaches (and moves or drops) the monthly partitions ending before the cutoff. Returns their names."""
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -older_than_months)
+    archived = []
+    with engine.begin() as connection:
+        if not drop:
+            connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+        for month in monthly_partitions(connection):
+            if add_months(month, 1) > cutoff:
+                break
+            name = partition_name(month)
+            connection.execute(text(f"ALTER TABLE {POSTS_TABLE} DETACH PARTITION {name}"))
+            # detaching does not fire the delete triggers that keep the post statistics up to date
+            forget_post_stats(connection, month, add_months(month, 1))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+            archived.append(name)
+        if archived:
+            # the posts are gone without a DELETE, so workers cannot know which cached posts to evict
+            invalidation_bus.publish_clear(connection, "post")
+    return archived
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create the default and upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    archive = commands.add_parser("archive", help="detach old monthly partitions")
+    archive.add_argument("--older-than-months", type=int, required=True)
+    target = archive.add_mutually_exclusive_group()
+    target.add_argument("--schema", default="archive", help="schema the detached partitions are moved to")
+    target.add_argument("--drop", action="store_true", help="drop detached partitions instead of keeping them")
+    args = parser.parse_args(argv)
+
+    if args.command == "ensure":
+        with engine.begin() as connection:
+            ensure_post_partitions(connection, months_ahead=args.months_ahead)
+        print("Partitions are up to date", file=sys.stderr)
+    else:
+        archived = archive_partitions(args.older_than_months, args.schema, args.drop)
+        action = "Dropped" if args.drop else f"Moved to schema {args.schema}"
+        print(f"{action}: {', '.join(archived) if archived else 'no partitions'}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
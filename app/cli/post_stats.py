@@ -0,0 +1,31 @@
+"""Maintenance of the post statistics rollups.
+
+Usage:
+    python -m app.cli.post_stats rebuild
+
+`rebuild` (re)installs the triggers on posts and recomputes the rollups from scratch, e.g. to backfill them or after
+posts were changed with the triggers disabled. Writes to posts are blocked while it runs.
+"""
+import argparse
+import sys
+import time
+
+from app.database.database import engine
+from app.database.post_stats import install_post_stats_triggers, rebuild_post_stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="recompute the post statistics from the posts table")
+    parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        install_post_stats_triggers(connection)
+        rebuild_post_stats(connection)
+    print(f"Post statistics rebuilt in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Production server: a pre-forking supervisor running tuned uvicorn workers.
+
+The app is imported and warmed up once in the supervisor, then the workers are forked from it, so they start
+without re-importing anything and share the warmed-up memory copy-on-write. All workers accept connections on the
+same listening socket. Workers that exit, including those recycled after SERVER_MAX_REQUESTS requests, are
+replaced straight away. Everything is configured through Settings (SERVER_*).
+
+Workers shut down gracefully: they stop accepting connections, drain their keep-alive connections (see
+app/middleware/drain.py), finish the in-flight requests and background queues, and close their db pool.
+SIGTERM/SIGINT stops every worker that way, SIGHUP replaces the workers one at a time (a rolling restart).
+
+Usage:
+    python -m app.cli.serve
+"""
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import List
+
+import uvicorn
+
+from app.core.config import config
+from app.middleware.drain import drain_state
+
+logger = logging.getLogger("chatterbox.serve")
+
+
+def worker_count() -> int:
+    return config.SERVER_WORKERS or os.cpu_count() or 1
+
+
+def build_config(app, limit_max_requests: int | None = None) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        loop="uvloop",
+        http="httptools",
+        backlog=config.SERVER_BACKLOG,
+        timeout_keep_alive=config.SERVER_KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        limit_max_requests=limit_max_requests,
+        proxy_headers=True,
+        lifespan="on",
+    )
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains keep-alive connections before its regular graceful shutdown.
+
+    uvicorn closes idle keep-alive connections as soon as it shuts down, so a request a client sends on one at that
+    moment is lost. Instead, requests keep being served with `Connection: close` for up to the keep-alive timeout,
+    by which time every idle connection has been closed by the client or has timed out.
+    """
+
+    async def shutdown(self, sockets: List[socket.socket] | None = None) -> None:
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+        drain_state.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.timeout_keep_alive
+        while self.server_state.connections and loop.time() < deadline and not self.force_exit:
+            await asyncio.sleep(0.1)
+        await super().shutdown(sockets)
+
+
+def warm_up(app) -> None:
+    """Does the one-off work that would otherwise slow down the first requests of every worker."""
+    from app.database.database import engine
+    from app.schemas.base_response import envelope_adapter, list_adapter
+    from app.schemas.login_response import LoginResponseModel
+    from app.schemas.post_model import PostResponse
+    from app.schemas.user_model import UserResponseModel
+    from app.utils import password_util
+
+    app.openapi()
+    password_util.dummy_verify("warm-up")
+    for model in (PostResponse, UserResponseModel):
+        list_adapter(model)
+        envelope_adapter(model)
+        envelope_adapter(List[model])
+    envelope_adapter(LoginResponseModel)
+    # connections opened while importing must not be shared by the forked workers
+    engine.dispose()
+
+
+class Supervisor:
+    def __init__(self, app, workers: int):
+        self.app = app
+        self.workers = workers
+        self.config = build_config(app)
+        self.socket: socket.socket | None = None
+        self.children: set[int] = set()
+        # workers asked to stop during a rolling restart, their replacements have already been started
+        self.retiring: set[int] = set()
+        self.restart_queue: List[int] = []
+        self.next_restart_at = 0.0
+        self.stopping = False
+        self.kill_at: float | None = None
+
+    def worker_max_requests(self) -> int | None:
+        if not config.SERVER_MAX_REQUESTS:
+            return None
+        # jitter keeps the workers from all recycling at the same moment
+        return config.SERVER_MAX_REQUESTS + random.randint(0, config.SERVER_MAX_REQUESTS_JITTER)
+
+    def spawn(self) -> None:
+        worker_config = build_config(self.app, self.worker_max_requests())
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        # in the worker
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # a SIGHUP sent to the whole process group is meant for the supervisor only
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        random.seed()
+        exit_code = 0
+        try:
+            DrainingServer(worker_config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def handle_stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        self.restart_queue.clear()
+        # the longest a worker can legitimately take to shut down, plus some slack
+        self.kill_at = time.monotonic() + (config.SERVER_KEEP_ALIVE_SECONDS + config.SERVER_GRACEFUL_SHUTDOWN_SECONDS +
+                                           config.SHUTDOWN_BACKGROUND_TIMEOUT_SECONDS + 5)
+        self.signal_children(signal.SIGTERM)
+
+    def handle_restart(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info("Rolling restart of the workers")
+            self.restart_queue = [pid for pid in self.children if pid not in self.retiring]
+
+    def signal_children(self, signum: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+    def restart_next(self) -> None:
+        """Starts a replacement for the next worker of the rolling restart, then asks that worker to stop."""
+        pid = self.restart_queue.pop(0)
+        if pid not in self.children:
+            return
+        self.spawn()
+        self.retiring.add(pid)
+        os.kill(pid, signal.SIGTERM)
+        self.next_restart_at = time.monotonic() + config.SERVER_ROLLING_RESTART_INTERVAL_SECONDS
+
+    def reap(self) -> None:
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            self.children.discard(pid)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if not self.stopping:
+                exit_code = os.waitstatus_to_exitcode(status)
+                logger.info(f"Worker {pid} exited with status {exit_code}, replacing it")
+                if exit_code != 0:
+                    # do not fork in a tight loop if workers keep failing to start
+                    time.sleep(1)
+                self.spawn()
+
+    def run(self) -> None:
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        logger.info(f"Starting {self.workers} workers (pid {os.getpid()})")
+        for _ in range(self.workers):
+            self.spawn()
+        while self.children:
+            try:
+                self.reap()
+            except ChildProcessError:
+                break
+            if self.restart_queue and time.monotonic() >= self.next_restart_at:
+                self.restart_next()
+            if self.kill_at is not None and time.monotonic() >= self.kill_at:
+                logger.error(f"Killing {len(self.children)} workers that did not shut down in time")
+                self.signal_children(signal.SIGKILL)
+                self.kill_at = None
+            time.sleep(0.1)
+        self.socket.close()
+
+
+def main(argv: List[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    from app.main import app
+
+    if not hasattr(os, "fork"):
+        # no pre-forking on this platform, run a single tuned worker
+        DrainingServer(build_config(app, config.SERVER_MAX_REQUESTS or None)).run()
+        return
+    warm_up(app)
+    Supervisor(app, worker_count()).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,10 +9,71 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_HOST: str
     DB_PORT: int
+    # Size of SQLAlchemy's compiled statement cache, shared by all statements of the engine
+    SQLALCHEMY_QUERY_CACHE_SIZE: int = 1200
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # Revocations of access tokens reach the other workers through the invalidation bus. Each worker also re-syncs
+    # them from the db this often (catching up on missed events) and purges expired ones
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 30
+    # Password hashing. New hashes use the first scheme; hashes of the other schemes, or with other costs than
+    # configured here, still verify and are transparently rehashed on the next successful login.
+    PASSWORD_SCHEMES: List[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    PBKDF2_SHA256_ROUNDS: int = 29000
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST_KIB: int = 19456
+    ARGON2_PARALLELISM: int = 1
+    # Token bucket limits for POST /auth/login, applied before any db or bcrypt work
+    LOGIN_RATE_LIMIT_IP_CAPACITY: int = 20
+    LOGIN_RATE_LIMIT_IP_REFILL_PER_MINUTE: float = 10
+    LOGIN_RATE_LIMIT_EMAIL_CAPACITY: int = 5
+    LOGIN_RATE_LIMIT_EMAIL_REFILL_PER_MINUTE: float = 2
+    # Response compression, responses smaller than the minimum size are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Opt-in write-behind for POST /posts: creates are queued and inserted in micro-batches
+    POST_WRITE_BEHIND_ENABLED: bool = False
+    POST_WRITE_BEHIND_BATCH_SIZE: int = 100
+    POST_WRITE_BEHIND_FLUSH_INTERVAL_MS: int = 5
+    POST_WRITE_BEHIND_MAX_QUEUE_SIZE: int = 1000
+    POST_WRITE_BEHIND_ENQUEUE_TIMEOUT_MS: int = 100
+    # Per-worker caches of users and posts, kept coherent across workers with LISTEN/NOTIFY
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TTL_SECONDS: int = 300
+    # Adaptive (AIMD) concurrency limit per worker, requests over it are shed with a 503
+    CONCURRENCY_LIMIT_INITIAL: int = 20
+    CONCURRENCY_LIMIT_MIN: int = 2
+    CONCURRENCY_LIMIT_MAX: int = 200
+    CONCURRENCY_TARGET_LATENCY_MS: int = 250
+    # Production server (python -m app.cli.serve). SERVER_WORKERS=0 starts one worker per cpu core and
+    # SERVER_MAX_REQUESTS=0 disables recycling workers after a number of requests.
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_SECONDS: int = 5
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # On shutdown a worker first drains for SERVER_KEEP_ALIVE_SECONDS, then waits up to SERVER_GRACEFUL_SHUTDOWN_SECONDS
+    # for in-flight requests and up to SHUTDOWN_BACKGROUND_TIMEOUT_SECONDS for background queues. Workers still alive
+    # after all of that are killed. On SIGHUP workers are replaced one every SERVER_ROLLING_RESTART_INTERVAL_SECONDS.
+    SHUTDOWN_BACKGROUND_TIMEOUT_SECONDS: int = 10
+    SERVER_ROLLING_RESTART_INTERVAL_SECONDS: int = 1
+    # Idempotency-Key support on write endpoints. Stored responses are replayed for IDEMPOTENCY_KEY_TTL_HOURS;
+    # a duplicate waits up to IDEMPOTENCY_WAIT_TIMEOUT_SECONDS for the first request, whose claim is considered
+    # abandoned after IDEMPOTENCY_LOCK_TIMEOUT_SECONDS (if it still finishes after that, its write is rolled back).
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: int = 10
+    IDEMPOTENCY_POLL_INTERVAL_MS: int = 50
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 60
+    # Post statistics: the per-day histogram covers the last POST_STATS_DEFAULT_DAYS unless a range is given
+    POST_STATS_DEFAULT_DAYS: int = 30
+    POST_STATS_MAX_DAYS: int = 366
 
     @property
     def database_url(self) -> str:
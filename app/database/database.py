@@ -6,7 +6,7 @@ from app.core.config import config
 
 DATABASE_URL = config.database_url
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, query_cache_size=config.SQLALCHEMY_QUERY_CACHE_SIZE)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,15 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, text
+from sqlalchemy import (
+    BigInteger, Column, Integer, SmallInteger, String, Boolean, Date, DateTime, Text, UniqueConstraint, func, text
+)
 
 from app.database.database import Base
 
 
 class Post(Base):
     __tablename__ = 'posts'
+    # Range partitioned by month on created_at (see app/database/partitions.py), so created_at is part of the key
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
     published = Column(Boolean, server_default='True', nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
 
 
 class User(Base):
@@ -22,3 +26,45 @@ class User(Base):
     is_verified = Column(Boolean, nullable=False, server_default=text("false"), default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_tokens'
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    jti = Column(String, nullable=False, unique=True, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # refresh token revocations are only checked by their unique jti, workers do not keep them in memory
+    refresh = Column(Boolean, nullable=False, server_default=text("false"), default=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_id_key'),)
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String, nullable=False)
+    # null while the first request with this key is still being processed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class PostDailyStats(Base):
+    """Number of posts created per (UTC) day and published flag, maintained by triggers on posts
+    (see app/database/post_stats.py). Counts are split over slots, sum them to read."""
+    __tablename__ = 'post_daily_stats'
+    day = Column(Date, primary_key=True, nullable=False)
+    published = Column(Boolean, primary_key=True, nullable=False)
+    slot = Column(SmallInteger, primary_key=True, nullable=False)
+    post_count = Column(BigInteger, nullable=False, server_default=text("0"))
+
+
+class PostStatsTotal(Base):
+    """Number of posts per published flag, maintained by the same triggers as PostDailyStats."""
+    __tablename__ = 'post_stats_totals'
+    published = Column(Boolean, primary_key=True, nullable=False)
+    slot = Column(SmallInteger, primary_key=True, nullable=False)
+    post_count = Column(BigInteger, nullable=False, server_default=text("0"))
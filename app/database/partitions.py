@@ -0,0 +1,110 @@
+import re
+from datetime import date, datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.database.database import engine
+from app.utils.periodic import run_periodically
+
+POSTS_TABLE = "posts"
+DEFAULT_PARTITION = "posts_default"
+MONTHLY_PARTITION_PATTERN = re.compile(r"^posts_(\d{4})_(\d{2})$")
+# Partitions are created this many months ahead so rows never have to land in the default partition
+MONTHS_AHEAD = 3
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{POSTS_TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Returns True if the posts table is a partitioned table (i.e. the partitioning migration has run)."""
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": POSTS_TABLE}).scalar()
+
+
+def create_monthly_partition(connection: Connection, month: date) -> None:
+    """Creates the partition of `month` unless it exists. Rows of that month sitting in the default partition are
+    moved into it, attaching the partition would fail otherwise.
+
+    The partition is created on its own and then attached, which only locks posts in SHARE UPDATE EXCLUSIVE mode:
+    reads and writes of posts (including an import running in another transaction) carry on meanwhile, where
+    CREATE TABLE ... PARTITION OF would lock them all out.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    lower, upper = f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"
+    if _table_exists(connection, name):
+        return
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {POSTS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if _table_exists(connection, DEFAULT_PARTITION):
+        # rows moved between partitions do not fire the statement triggers on posts, they stay counted in the same
+        # day of the post statistics
+        connection.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= '{lower}' AND created_at < '{upper}' "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ))
+    connection.execute(text(
+        f"ALTER TABLE {POSTS_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+
+def _table_exists(connection: Connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def ensure_post_partitions(connection: Connection, from_month: date | None = None,
+                           months_ahead: int = MONTHS_AHEAD, to_month: date | None = None) -> None:
+    """Creates the default partition and one partition per month from `from_month` (defaults to the current month)
+    up to `months_ahead` months in the future, or up to `to_month` if that is later. Existing partitions are left
+    alone.
+    """
+    if connection.dialect.name != "postgresql" or not is_partitioned(connection):
+        return
+    # serialise workers starting at the same time, CREATE ... IF NOT EXISTS is not race free
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('posts_partitions'))"))
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {POSTS_TABLE} DEFAULT"))
+    current_month = month_start(datetime.now(timezone.utc))
+    month = month_start(from_month) if from_month else current_month
+    last_month = add_months(current_month, months_ahead)
+    if to_month is not None:
+        last_month = max(last_month, month_start(to_month))
+    while month <= last_month:
+        create_monthly_partition(connection, month)
+        month = add_months(month, 1)
+
+
+def monthly_partitions(connection: Connection) -> List[date]:
+    """Returns the months of the monthly partitions currently attached to the posts table, oldest first."""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": POSTS_TABLE}).scalars()
+    months = []
+    for name in names:
+        match = MONTHLY_PARTITION_PATTERN.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def run_partition_maintenance(interval_seconds: int = 24 * 60 * 60) -> None:
+    """Background loop that keeps monthly partitions created ahead of time for long-running workers."""
+    def ensure():
+        with engine.begin() as connection:
+            ensure_post_partitions(connection)
+
+    await run_periodically(ensure, interval_seconds, "create upcoming posts partitions")
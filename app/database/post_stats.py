@@ -0,0 +1,146 @@
+"""Rollups of the posts table backing the post statistics endpoint.
+
+post_daily_stats holds the number of posts per (UTC) day of created_at and published flag, post_stats_totals the
+number of posts per published flag. Both are kept up to date by statement level triggers on posts, so every way of
+writing posts (the API, the write-behind batch writer, COPY imports) is accounted for, and a batch insert costs one
+rollup update per statement instead of one per row.
+
+Every count is split over STATS_SLOTS rows, and a transaction updates the slot of its own backend. Otherwise all
+concurrent writes would queue on the lock of the same totals and today's row until their transactions commit.
+Readers sum the slots.
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.database.partitions import POSTS_TABLE
+
+DAILY_STATS_TABLE = "post_daily_stats"
+TOTALS_TABLE = "post_stats_totals"
+TRIGGER_FUNCTION = "post_stats_apply"
+STATS_SLOTS = 16
+# a trigger using transition tables can only fire on a single event
+TRIGGERS = {
+    "post_stats_insert": "AFTER INSERT ON posts REFERENCING NEW TABLE AS new_rows",
+    "post_stats_update": "AFTER UPDATE ON posts REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "post_stats_delete": "AFTER DELETE ON posts REFERENCING OLD TABLE AS old_rows",
+}
+
+# Rows are upserted in key order, so concurrent writers lock the rollup rows in the same order and cannot deadlock
+TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION {TRIGGER_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    days date[];
+    flags boolean[];
+    deltas bigint[];
+    backend_slot smallint := pg_backend_pid() % {STATS_SLOTS};
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(day ORDER BY day, published), array_agg(published ORDER BY day, published),
+               array_agg(delta ORDER BY day, published)
+        INTO days, flags, deltas
+        FROM (SELECT (created_at AT TIME ZONE 'UTC')::date AS day, published, count(*) AS delta
+              FROM new_rows GROUP BY 1, 2) AS changes;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(day ORDER BY day, published), array_agg(published ORDER BY day, published),
+               array_agg(delta ORDER BY day, published)
+        INTO days, flags, deltas
+        FROM (SELECT (created_at AT TIME ZONE 'UTC')::date AS day, published, -count(*) AS delta
+              FROM old_rows GROUP BY 1, 2) AS changes;
+    ELSE
+        SELECT array_agg(day ORDER BY day, published), array_agg(published ORDER BY day, published),
+               array_agg(delta ORDER BY day, published)
+        INTO days, flags, deltas
+        FROM (SELECT (created_at AT TIME ZONE 'UTC')::date AS day, published, sum(delta) AS delta
+              FROM (SELECT created_at, published, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT created_at, published, -1 AS delta FROM old_rows) AS moved
+              GROUP BY 1, 2 HAVING sum(delta) <> 0) AS changes;
+    END IF;
+    IF days IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO {DAILY_STATS_TABLE} AS stats (day, published, slot, post_count)
+    SELECT day, published, backend_slot, delta FROM unnest(days, flags, deltas) AS changes(day, published, delta)
+    ON CONFLICT (day, published, slot) DO UPDATE SET post_count = stats.post_count + EXCLUDED.post_count;
+
+    INSERT INTO {TOTALS_TABLE} AS totals (published, slot, post_count)
+    SELECT published, backend_slot, sum(delta) FROM unnest(flags, deltas) AS changes(published, delta)
+    GROUP BY published ORDER BY published
+    ON CONFLICT (published, slot) DO UPDATE SET post_count = totals.post_count + EXCLUDED.post_count;
+    RETURN NULL;
+END;
+$$
+"""
+
+
+def install_post_stats_triggers(connection: Connection) -> None:
+    """(Re)creates the trigger function and the triggers on posts."""
+    connection.execute(text(TRIGGER_FUNCTION_SQL))
+    for name, definition in TRIGGERS.items():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name} ON {POSTS_TABLE}"))
+        connection.execute(text(f"CREATE TRIGGER {name} {definition} FOR EACH STATEMENT "
+                                f"EXECUTE FUNCTION {TRIGGER_FUNCTION}()"))
+
+
+def drop_post_stats_triggers(connection: Connection) -> None:
+    for name in TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name} ON {POSTS_TABLE}"))
+    connection.execute(text(f"DROP FUNCTION IF EXISTS {TRIGGER_FUNCTION}()"))
+
+
+def triggers_installed(connection: Connection) -> bool:
+    installed = connection.execute(text(
+        "SELECT count(*) FROM pg_trigger WHERE tgrelid = to_regclass(:table) AND tgname = ANY(:names)"
+    ), {"table": POSTS_TABLE, "names": list(TRIGGERS)}).scalar()
+    return installed == len(TRIGGERS)
+
+
+def rebuild_post_stats(connection: Connection) -> None:
+    """Recomputes both rollups from the posts table, into slot 0.
+    Writes to posts are blocked until the transaction commits, so no trigger update can be lost in between.
+    """
+    connection.execute(text(f"LOCK TABLE {POSTS_TABLE} IN SHARE MODE"))
+    connection.execute(text(f"LOCK TABLE {DAILY_STATS_TABLE}, {TOTALS_TABLE} IN EXCLUSIVE MODE"))
+    connection.execute(text(f"DELETE FROM {DAILY_STATS_TABLE}"))
+    connection.execute(text(f"DELETE FROM {TOTALS_TABLE}"))
+    connection.execute(text(
+        f"INSERT INTO {DAILY_STATS_TABLE} (day, published, slot, post_count) "
+        f"SELECT (created_at AT TIME ZONE 'UTC')::date, published, 0, count(*) FROM {POSTS_TABLE} GROUP BY 1, 2"
+    ))
+    connection.execute(text(
+        f"INSERT INTO {TOTALS_TABLE} (published, slot, post_count) "
+        f"SELECT published, 0, sum(post_count) FROM {DAILY_STATS_TABLE} GROUP BY published"
+    ))
+
+
+def forget_post_stats(connection: Connection, from_day: date, to_day: date) -> None:
+    """Removes the days in [from_day, to_day) from the rollups, for posts that leave the table without a DELETE
+    (e.g. a detached partition).
+    """
+    parameters = {"from_day": from_day, "to_day": to_day}
+    # the whole count is taken off slot 0, only the sum over the slots is meaningful
+    connection.execute(text(
+        f"INSERT INTO {TOTALS_TABLE} AS totals (published, slot, post_count) "
+        f"SELECT published, 0, -sum(post_count) FROM {DAILY_STATS_TABLE} "
+        f"WHERE day >= :from_day AND day < :to_day GROUP BY published "
+        f"ON CONFLICT (published, slot) DO UPDATE SET post_count = totals.post_count + EXCLUDED.post_count"
+    ), parameters)
+    connection.execute(text(f"DELETE FROM {DAILY_STATS_TABLE} WHERE day >= :from_day AND day < :to_day"),
+                       parameters)
+
+
+def ensure_post_stats(connection: Connection) -> None:
+    """Installs the triggers if they are missing, backfilling the rollups from the existing posts."""
+    if connection.dialect.name != "postgresql":
+        return
+    if triggers_installed(connection):
+        return
+    # serialise workers starting at the same time
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('post_stats'))"))
+    if triggers_installed(connection):
+        return
+    install_post_stats_triggers(connection)
+    rebuild_post_stats(connection)
@@ -0,0 +1,54 @@
+"""Pre-built statements for the queries that run on (nearly) every request.
+
+Statements are constructed once at import time with bound parameters instead of going through Session.query() on
+every call. Executing the same statement object lets SQLAlchemy find its compiled form in the engine's compiled
+cache straight away, without building and hashing a new query construct per request.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+from sqlalchemy import BigInteger, bindparam, cast, func, select, Select, update
+
+from app.database.models import IdempotencyKey, Post, PostDailyStats, PostStatsTotal, User
+
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+USER_ID_BY_EMAIL = select(User.id).where(User.email == bindparam("email")).limit(1)
+# only replaces the hash if it has not been changed since it was read
+REPLACE_USER_PASSWORD_HASH = update(User).where(
+    User.id == bindparam("user_id"), User.password == bindparam("old_hash")
+).values(password=bindparam("new_hash"))
+
+POST_BY_ID = select(Post).where(Post.id == bindparam("post_id"))
+# the rollup counts are split over slots (see app/database/post_stats.py)
+POST_STATS_TOTALS = select(PostStatsTotal.published, cast(func.sum(PostStatsTotal.post_count), BigInteger)).group_by(
+    PostStatsTotal.published)
+POST_DAILY_STATS_BETWEEN = select(
+    PostDailyStats.day, PostDailyStats.published, cast(func.sum(PostDailyStats.post_count), BigInteger)
+).where(
+    PostDailyStats.day >= bindparam("start"), PostDailyStats.day <= bindparam("end")
+).group_by(PostDailyStats.day, PostDailyStats.published)
+
+IDEMPOTENCY_KEY_BY_USER_AND_KEY = select(
+    IdempotencyKey.id, IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body,
+    IdempotencyKey.created_at, IdempotencyKey.expires_at
+).where(IdempotencyKey.user_id == bindparam("user_id"), IdempotencyKey.key == bindparam("key"))
+
+
+@lru_cache(maxsize=128)
+def post_list(fields: Tuple[str, ...], created_after: bool = False, created_before: bool = False) -> Select:
+    """Returns the list statement for the given columns. The created_at window, when used, is bound as
+    :created_after / :created_before.
+    """
+    statement = select(*(getattr(Post, field) for field in fields))
+    if created_after:
+        statement = statement.where(Post.created_at >= bindparam("created_after"))
+    if created_before:
+        statement = statement.where(Post.created_at < bindparam("created_before"))
+    return statement
+
+
+@lru_cache(maxsize=128)
+def user_list(fields: Tuple[str, ...]) -> Select:
+    """Returns the list statement for the given columns."""
+    return select(*(getattr(User, field) for field in fields))
@@ -1,16 +1,23 @@
+import math
 from http import HTTPStatus
 
 from pydantic import EmailStr
 from starlette import status
 
 
+def _retry_after_headers(retry_after: float) -> dict:
+    """Retry-After takes whole seconds, rounded up so clients never retry too early."""
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
 class ChatterBoxException(Exception):
     """This is the base clas for all the ChatterBox application errors"""
 
-    def __init__(self, message: str, reason: str = None, status_code: int = 400):
+    def __init__(self, message: str, reason: str = None, status_code: int = 400, headers: dict = None):
         self.message = message
         self.reason = reason
         self.status_code = status_code
+        self.headers = headers
         super().__init__(message)
 
     @staticmethod
@@ -47,6 +54,13 @@ class TokenSignatureException(ChatterBoxException):
         super().__init__(message="Invalid Token Signature", reason=reason, status_code=status.HTTP_401_UNAUTHORIZED)
 
 
+class RevokedTokenException(ChatterBoxException):
+    """Raised when a JWT token has been revoked (e.g. after logout or refresh token rotation)"""
+
+    def __init__(self, reason: str = "Token has been revoked. Please log in again."):
+        super().__init__(message="Revoked Token", reason=reason, status_code=status.HTTP_401_UNAUTHORIZED)
+
+
 class EntityNotFoundException(ChatterBoxException):
     """The entity the user is trying to access is not found"""
 
@@ -84,6 +98,39 @@ class InsufficientPermissionsException(ChatterBoxException):
         super().__init__(message="Insufficient permissions", reason=reason, status_code=status.HTTP_403_FORBIDDEN)
 
 
+class TooManyRequestsException(ChatterBoxException):
+    """The client has exceeded the allowed request rate"""
+
+    def __init__(self, retry_after: float, reason: str = "Too many requests. Please try again later."):
+        super().__init__(message="Too many requests", reason=reason, status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                         headers=_retry_after_headers(retry_after))
+
+
+class ServiceUnavailableException(ChatterBoxException):
+    """The server is temporarily unable to take on more work"""
+
+    def __init__(self, retry_after: float = 1, reason: str = "The server is busy. Please try again shortly."):
+        super().__init__(message="Service unavailable", reason=reason, status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         headers=_retry_after_headers(retry_after))
+
+
+class IdempotencyKeyMismatchException(ChatterBoxException):
+    """The Idempotency-Key has already been used for a different request"""
+
+    def __init__(self, reason: str = "This Idempotency-Key has already been used with a different request."):
+        super().__init__(message="Idempotency key reused", reason=reason,
+                         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+class IdempotencyRequestInProgressException(ChatterBoxException):
+    """A request with the same Idempotency-Key is still being processed"""
+
+    def __init__(self, retry_after: float = 1,
+                 reason: str = "A request with this Idempotency-Key is still being processed. Please retry shortly."):
+        super().__init__(message="Request in progress", reason=reason, status_code=status.HTTP_409_CONFLICT,
+                         headers=_retry_after_headers(retry_after))
+
+
 # Database errors
 class DatabaseException(ChatterBoxException):
     """Base exception for all database-related errors."""
@@ -6,14 +6,23 @@ from starlette import status
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.requests import Request
 
-from app.exceptions.custom_exceptions import ChatterBoxException, UnknownHashException
+from app.exceptions.custom_exceptions import (
+    ChatterBoxException,
+    DatabaseConnectionException,
+    DatabaseTimeoutException,
+    UnknownHashException
+)
+from app.middleware.concurrency_limit import mark_overloaded
 from app.utils.exception_util import create_error_response
 
 
 def chatterbox_exception_handler(request: Request, exc: ChatterBoxException) -> Response:
     """Handles all ChatterBox custom exceptions."""
     logging.exception(f"Exception occurred at {request.url.path} - {exc.message}")
-    return create_error_response(status_code=exc.status_code, message=exc.message, reason=exc.reason)
+    if isinstance(exc, (DatabaseConnectionException, DatabaseTimeoutException)):
+        mark_overloaded(request.scope)
+    return create_error_response(status_code=exc.status_code, message=exc.message, reason=exc.reason,
+                                 headers=exc.headers)
 
 
 def unknown_hash_exception_handler(request: Request, exc: UnknownHashException) -> Response:
@@ -41,6 +50,8 @@ async def integrity_error_handler(request: Request, exc: IntegrityError) -> JSON
 async def database_connection_error_handler(request: Request, exc: OperationalError) -> JSONResponse:
     """Handles database connection issues."""
     logging.exception(f"Database Connection Error at {request.url.path} - {exc}")
+    # connection failures and statement timeouts are what the concurrency limit backs off on
+    mark_overloaded(request.scope)
     return create_error_response(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, message="Database connection error",
                                  reason="Could not connect to the database. Please try again later.")
 
@@ -1,9 +1,16 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.exc import IntegrityError, OperationalError
 
+from .core.config import config
 from .database import models
 from .database.database import engine
+from .database.partitions import ensure_post_partitions, run_partition_maintenance
+from .database.post_stats import ensure_post_stats
 from .exceptions.custom_exceptions import ChatterBoxException, UnknownHashException
 from .exceptions.exception_handler import (
     chatterbox_exception_handler,
@@ -13,11 +20,49 @@ from .exceptions.exception_handler import (
     general_exception_handler,
     unknown_hash_exception_handler
 )
+from .middleware.compression import CompressionMiddleware
+from .middleware.concurrency_limit import ConcurrencyLimitMiddleware
+from .middleware.drain import DrainMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from .routers import post, user, authentication
+from .service.idempotency_service import run_idempotency_maintenance
+from .service.invalidation_bus import invalidation_bus
+from .service.post_batch_writer import post_batch_writer
+from .service.token_revocation_service import run_revocation_maintenance
 
 models.Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    ensure_post_partitions(connection)
+    ensure_post_stats(connection)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Starts the per-worker background tasks. On shutdown, which runs once the server has drained the in-flight
+    requests, flushes the background queues within SHUTDOWN_BACKGROUND_TIMEOUT_SECONDS and closes the pool.
+    """
+    revocation_task = asyncio.create_task(run_revocation_maintenance())
+    partition_task = asyncio.create_task(run_partition_maintenance())
+    idempotency_task = asyncio.create_task(run_idempotency_maintenance())
+    invalidation_bus.start()
+    if config.POST_WRITE_BEHIND_ENABLED:
+        await post_batch_writer.start()
+    yield
+    try:
+        await asyncio.wait_for(post_batch_writer.stop(), timeout=config.SHUTDOWN_BACKGROUND_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logging.error("Timed out writing the queued posts on shutdown")
+    await asyncio.to_thread(invalidation_bus.stop)
+    for task in (revocation_task, partition_task, idempotency_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # close the pooled connections now instead of leaving them for postgres to time out
+    engine.dispose()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="My API",
     description="This API provides authentication and user management services.",
     version="1.0.0",
@@ -48,6 +93,15 @@ app.add_exception_handler(IntegrityError, integrity_error_handler)
 app.add_exception_handler(OperationalError, database_connection_error_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+                   gzip_level=config.COMPRESSION_GZIP_LEVEL, brotli_quality=config.COMPRESSION_BROTLI_QUALITY)
+# Added late so it sheds load before any other work is done
+app.add_middleware(ConcurrencyLimitMiddleware, initial_limit=config.CONCURRENCY_LIMIT_INITIAL,
+                   min_limit=config.CONCURRENCY_LIMIT_MIN, max_limit=config.CONCURRENCY_LIMIT_MAX,
+                   target_latency_ms=config.CONCURRENCY_TARGET_LATENCY_MS)
+# Outermost, so shed responses also close the connection while the worker drains
+app.add_middleware(DrainMiddleware)
+
 app.include_router(post.router, tags=["Posts"])
 app.include_router(user.router, tags=["Users"])
 app.include_router(authentication.router, tags=["Authentication"])
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.exceptions.custom_exceptions import ServiceUnavailableException
+from app.utils.exception_util import create_error_response
+
+# Priorities, highest first. Each may use this share of the current limit, so when the limit shrinks under
+# overload bulk writes are shed first, then reads, and authentication keeps working the longest.
+PRIORITY_CRITICAL = "critical"
+PRIORITY_READ = "read"
+PRIORITY_WRITE = "write"
+DEFAULT_PRIORITY_SHARES = {PRIORITY_CRITICAL: 1.0, PRIORITY_READ: 0.9, PRIORITY_WRITE: 0.6}
+
+
+# Per-request flags set in the ASGI scope by code further down the stack
+OVERLOADED_SCOPE_KEY = "concurrency_limit.overloaded"
+LATENCY_EXEMPT_SCOPE_KEY = "concurrency_limit.latency_exempt"
+
+
+def mark_overloaded(scope: Scope) -> None:
+    """Reports the request as failed because of overload (e.g. a db or pool timeout), which backs the limit off."""
+    scope[OVERLOADED_SCOPE_KEY] = True
+
+
+def exclude_from_latency(scope: Scope) -> None:
+    """Keeps the request's latency out of the limit's signal, for requests that are slow on purpose."""
+    scope[LATENCY_EXEMPT_SCOPE_KEY] = True
+
+
+def default_priority(scope: Scope) -> str:
+    """Authentication outranks reads, which outrank writes."""
+    if scope["path"].startswith("/auth"):
+        return PRIORITY_CRITICAL
+    if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+        return PRIORITY_READ
+    return PRIORITY_WRITE
+
+
+class AIMDLimit:
+    """Concurrency limit adjusted with additive increase / multiplicative decrease on observed latency.
+
+    While requests finish within `target_latency_seconds` the limit grows by about one per limit's worth of
+    requests, while the limit is being used or until it is back at `initial_limit`. A slow request or one that
+    failed because of overload cuts it by `backoff_ratio`, at most once per `target_latency_seconds`, so a single
+    burst of slow responses does not collapse the limit to its minimum.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, target_latency_seconds: float,
+                 backoff_ratio: float = 0.9):
+        self.limit = float(initial_limit)
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_seconds = target_latency_seconds
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self._last_backoff = float("-inf")
+        self._lock = threading.Lock()
+
+    def try_acquire(self, share: float) -> bool:
+        with self._lock:
+            if self.in_flight >= max(1.0, self.limit * share):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency_seconds: float | None, overloaded: bool = False) -> None:
+        """Returns a slot. `latency_seconds` is None for requests that must not be used as a latency sample."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded or (latency_seconds is not None and latency_seconds > self.target_latency_seconds):
+                if now - self._last_backoff >= self.target_latency_seconds:
+                    self._last_backoff = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            elif latency_seconds is None:
+                return
+            elif self.in_flight >= self.limit / 2 or self.limit < self.initial_limit:
+                # only grow past the initial limit while the limit is actually being used
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class ConcurrencyLimitMiddleware:
+    """Sheds load before requests queue up for database connections.
+
+    Requests over the adaptive limit for their priority fail fast with a 503 and Retry-After, in the usual error
+    envelope, instead of waiting on the pool until they time out.
+
+    Only latency and overload failures (pool and db timeouts, see `mark_overloaded`) adjust the limit. Critical
+    (authentication) requests are CPU bound on password hashing rather than on the db, so they hold a slot but are not
+    used as latency samples, and neither are requests that wait on purpose (see `exclude_from_latency`).
+    """
+
+    def __init__(self, app: ASGIApp, initial_limit: int = 20, min_limit: int = 2, max_limit: int = 200,
+                 target_latency_ms: int = 250, retry_after_seconds: int = 1, priority_of=default_priority,
+                 priority_shares: dict[str, float] | None = None,
+                 latency_exempt_priorities: tuple[str, ...] = (PRIORITY_CRITICAL,)):
+        self.app = app
+        self.limiter = AIMDLimit(initial_limit, min_limit, max_limit, target_latency_ms / 1000)
+        self.retry_after_seconds = retry_after_seconds
+        self.priority_of = priority_of
+        self.priority_shares = priority_shares or DEFAULT_PRIORITY_SHARES
+        self.latency_exempt_priorities = latency_exempt_priorities
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = self.priority_of(scope)
+        if not self.limiter.try_acquire(self.priority_shares[priority]):
+            exc = ServiceUnavailableException(retry_after=self.retry_after_seconds)
+            response = create_error_response(status_code=exc.status_code, message=exc.message, reason=exc.reason,
+                                             headers=exc.headers)
+            await response(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except PoolTimeoutError:
+            mark_overloaded(scope)
+            raise
+        finally:
+            latency_seconds = time.perf_counter() - started_at
+            if priority in self.latency_exempt_priorities or scope.get(LATENCY_EXEMPT_SCOPE_KEY):
+                latency_seconds = None
+            self.limiter.release(latency_seconds, overloaded=scope.get(OVERLOADED_SCOPE_KEY, False))
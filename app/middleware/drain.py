@@ -0,0 +1,39 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class DrainState:
+    """Set once the worker has started shutting down (see app/cli/serve.py)."""
+
+    def __init__(self):
+        self.draining = False
+
+    def start(self) -> None:
+        self.draining = True
+
+
+drain_state = DrainState()
+
+
+class DrainMiddleware:
+    """While the worker drains, answers every request with `Connection: close`.
+
+    Clients holding a keep-alive connection to a worker that is shutting down finish their current request normally
+    and then reconnect, landing on another worker, instead of having the idle connection closed under them.
+    """
+
+    def __init__(self, app: ASGIApp, state: DrainState = drain_state):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.state.draining:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_closing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [(name, value) for name, value in message.get("headers", []) if name.lower() != b"connection"]
+                message = {**message, "headers": headers + [(b"connection", b"close")]}
+            await send(message)
+
+        await self.app(scope, receive, send_closing)
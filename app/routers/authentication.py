@@ -1,21 +1,26 @@
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Request
 from starlette.status import HTTP_200_OK
 
 from app.schemas.base_response import BaseResponse
 from app.schemas.login_response import TokenRefreshModel, LoginResponseModel
 from app.schemas.user_model import UserLoginModel
 from app.service.auth_service import AuthService
+from app.utils.rate_limiter import login_rate_limiter
+from app.utils.token_util import get_token_from_header
 
 router = APIRouter(prefix='/auth', tags=["Authentication"])
 
 
 @router.post("/login", response_model=BaseResponse[LoginResponseModel])
-def login(user_credentials: UserLoginModel, auth_service: AuthService = Depends()):
+def login(request: Request, user_credentials: UserLoginModel, auth_service: AuthService = Depends()):
     """Authenticates a user with given credentials i.e email and password.
     An access token and refresh token is generated on successful login.
     """
+    # Throttle before touching the db or running bcrypt so bursts of attempts are cheap to reject
+    login_rate_limiter.check(request.client.host if request.client else None, user_credentials.email)
     login_response = auth_service.authenticate(user_credentials)
-    return BaseResponse.success(data=login_response, message=f"Login Success", status_code=HTTP_200_OK)
+    return BaseResponse.success(data=login_response, message=f"Login Success", status_code=HTTP_200_OK,
+                                data_type=LoginResponseModel)
 
 
 @router.post("/refresh-token", response_model=BaseResponse[LoginResponseModel])
@@ -25,5 +30,14 @@ def refresh_token(refresh_data: TokenRefreshModel, auth_service: AuthService = D
     return BaseResponse.success(
         message="Token refreshed successfully",
         status_code=200,
-        data=token_response
+        data=token_response,
+        data_type=LoginResponseModel
     )
+
+
+@router.post("/logout", response_model=BaseResponse)
+def logout(refresh_data: TokenRefreshModel, access_token: str = Depends(get_token_from_header),
+           auth_service: AuthService = Depends()):
+    """Revokes the refresh token and the access token of the current session."""
+    auth_service.logout(refresh_data.refresh_token, access_token)
+    return BaseResponse.success(message="Logout successful", status_code=HTTP_200_OK)
@@ -1,10 +1,16 @@
-from typing import List
+from datetime import date, datetime
+from functools import partial
+from typing import List, Optional
 
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Header, Query, Request
 from starlette import status
 
+from app.core.config import config
 from app.schemas.base_response import BaseResponse
-from app.schemas.post_model import PostResponse, PostModel
+from app.schemas.post_model import PostResponse, PostModel, PostStatsResponse
+from app.schemas.projection import parse_fields, projection_model
+from app.service.idempotency_service import IdempotencyService, request_fingerprint
+from app.service.post_batch_writer import post_batch_writer
 from app.service.post_service import PostService
 from app.utils.token_util import get_current_user
 
@@ -12,31 +18,67 @@ router = APIRouter(prefix="/posts", tags=["Posts"], dependencies=[Depends(get_cu
 
 
 @router.get("", response_model=BaseResponse[List[PostResponse]])
-async def get_posts(post_service: PostService = Depends()):
-    """Retrieves all posts from the database."""
-    posts = post_service.get_all_posts()
-    return BaseResponse.success(data=posts, message="Posts retrieved successfully")
+async def get_posts(fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. id,title"),
+                    created_after: Optional[datetime] = Query(None, description="Only posts created at or after"),
+                    created_before: Optional[datetime] = Query(None, description="Only posts created before"),
+                    post_service: PostService = Depends()):
+    """Retrieves all posts from the database. Use `fields` to only load and return some of the post fields.
+    Giving a created_at window keeps the query to the matching monthly partitions.
+    """
+    selected_fields = parse_fields(fields, PostResponse)
+    posts = post_service.get_all_posts(selected_fields, created_after, created_before)
+    return BaseResponse.success(data=posts, message="Posts retrieved successfully",
+                                data_type=List[projection_model(PostResponse, selected_fields)])
+
+
+@router.get("/stats", response_model=BaseResponse[PostStatsResponse])
+async def get_post_stats(start: Optional[date] = Query(None, description="First day of the histogram (UTC)"),
+                         end: Optional[date] = Query(None, description="Last day of the histogram (UTC), defaults to today"),
+                         post_service: PostService = Depends()):
+    """Returns the total, published and draft post counts and the number of posts created per day.
+    The histogram covers the last POST_STATS_DEFAULT_DAYS days unless a range is given.
+    """
+    stats = post_service.get_stats(start, end)
+    return BaseResponse.success(data=stats, message="Post statistics retrieved successfully",
+                                data_type=PostStatsResponse)
 
 
 @router.get("/{post_id}", response_model=BaseResponse[PostResponse])
 async def get_post(post_id: int, post_service: PostService = Depends()):
     """Retrieves a single post from the database."""
     post = post_service.get_post_by_id(post_id)
-    return BaseResponse.success(data=post, message="Post retrieved successfully", status_code=status.HTTP_200_OK)
+    return BaseResponse.success(data=post, message="Post retrieved successfully", status_code=status.HTTP_200_OK,
+                                data_type=PostResponse)
 
 
 @router.post("", response_model=BaseResponse[PostResponse], status_code=status.HTTP_201_CREATED)
-async def create_posts(post: PostModel, post_service: PostService = Depends()):
-    """Creates a new post."""
-    new_post = post_service.create_post(post)
-    return BaseResponse.success(data=new_post, message="Post created successfully", status_code=status.HTTP_201_CREATED)
+async def create_posts(post: PostModel, request: Request,
+                       idempotency_key: Optional[str] = Header(None, description="Makes retries of this request safe"),
+                       current_user: dict = Depends(get_current_user), post_service: PostService = Depends(),
+                       idempotency_service: IdempotencyService = Depends()):
+    """Creates a new post. Repeating the request with the same Idempotency-Key replays the first response."""
+    async def create(commit: bool = True):
+        # uncommitted posts are committed by the idempotency service with the stored response, never written behind
+        if commit and config.POST_WRITE_BEHIND_ENABLED:
+            new_post = await post_batch_writer.submit(post)
+        else:
+            new_post = post_service.create_post(post, commit=commit)
+        return BaseResponse.success(data=new_post, message="Post created successfully",
+                                    status_code=status.HTTP_201_CREATED, data_type=PostResponse)
+
+    if idempotency_key is None:
+        return await create()
+    fingerprint = request_fingerprint(request.method, request.url.path, post.model_dump_json())
+    return await idempotency_service.execute(current_user["id"], idempotency_key, fingerprint,
+                                             partial(create, commit=False))
 
 
 @router.put("/{post_id}", response_model=BaseResponse[PostResponse])
 async def update_post(post_id: int, updated_post: PostModel, post_service: PostService = Depends()):
     """Updates a single post from the database."""
     post = post_service.update_post(post_id, updated_post)
-    return BaseResponse.success(data=post, message="Post updated successfully", status_code=status.HTTP_200_OK)
+    return BaseResponse.success(data=post, message="Post updated successfully", status_code=status.HTTP_200_OK,
+                                data_type=PostResponse)
 
 
 @router.delete("/{post_id}", response_model=BaseResponse[PostResponse])
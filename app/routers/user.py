@@ -1,11 +1,14 @@
 import logging
-from typing import List
+from functools import partial
+from typing import List, Optional
 
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Header, Query, Request
 from starlette import status
 
 from app.schemas.base_response import BaseResponse
+from app.schemas.projection import parse_fields, projection_model
 from app.schemas.user_model import UserResponseModel, UserCreateModel
+from app.service.idempotency_service import IdempotencyService, request_fingerprint
 from app.service.user_service import UserService
 from app.utils.token_util import get_current_user
 
@@ -13,10 +16,24 @@ router = APIRouter(prefix="/users", tags=["Users"], dependencies=[Depends(get_cu
 
 
 @router.post("", response_model=BaseResponse[UserResponseModel])
-async def create_user(user: UserCreateModel, user_service: UserService = Depends()):
-    """Creates and stores a new user to the database."""
-    new_user = user_service.create_user(user)
-    return BaseResponse.success(data=new_user, message="User created successfully", status_code=status.HTTP_201_CREATED)
+async def create_user(user: UserCreateModel, request: Request,
+                      idempotency_key: Optional[str] = Header(None, description="Makes retries of this request safe"),
+                      current_user: dict = Depends(get_current_user), user_service: UserService = Depends(),
+                      idempotency_service: IdempotencyService = Depends()):
+    """Creates and stores a new user to the database.
+    Repeating the request with the same Idempotency-Key replays the first response.
+    """
+    async def create(commit: bool = True):
+        new_user = user_service.create_user(user, commit=commit)
+        return BaseResponse.success(data=new_user, message="User created successfully",
+                                    status_code=status.HTTP_201_CREATED, data_type=UserResponseModel)
+
+    if idempotency_key is None:
+        return await create()
+    fingerprint = request_fingerprint(request.method, request.url.path, user.model_dump_json())
+    # committed by the idempotency service, together with the stored response
+    return await idempotency_service.execute(current_user["id"], idempotency_key, fingerprint,
+                                             partial(create, commit=False))
 
 
 @router.get("/{user_id}", response_model=BaseResponse[UserResponseModel])
@@ -25,11 +42,14 @@ async def get_user(user_id: int = None, user_service: UserService = Depends(),
     """Returns a user who matches the given user id."""
     logging.info(f"Current user: {current_user}")
     user = user_service.get_user_by_id(user_id)
-    return BaseResponse.success(data=user, message="User retrieved successfully")
+    return BaseResponse.success(data=user, message="User retrieved successfully", data_type=UserResponseModel)
 
 
-@router.get("", response_model=List[BaseResponse[UserResponseModel]])
-async def get_users(user_service: UserService = Depends()):
-    """Returns a list of all users."""
-    users = user_service.get_all_users()
-    return BaseResponse.success(data=users, message="Users retrieved successfully")
+@router.get("", response_model=BaseResponse[List[UserResponseModel]])
+async def get_users(fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. id,email"),
+                    user_service: UserService = Depends()):
+    """Returns a list of all users. Use `fields` to only load and return some of the user fields."""
+    selected_fields = parse_fields(fields, UserResponseModel)
+    users = user_service.get_all_users(selected_fields)
+    return BaseResponse.success(data=users, message="Users retrieved successfully",
+                                data_type=List[projection_model(UserResponseModel, selected_fields)])
@@ -1,10 +1,11 @@
 from datetime import datetime
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Generic, TypeVar, Optional
+from typing import Any, Generic, List, TypeVar, Optional
 from zoneinfo import ZoneInfo
 
-from pydantic import BaseModel, ConfigDict
-from starlette.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from starlette.responses import Response
 
 TIMEZONE = ZoneInfo('Etc/GMT-3')
 
@@ -28,17 +29,22 @@ class BaseResponse(BaseModel, Generic[T]):
         return super().model_dump(*args, exclude_none=True)
 
     @classmethod
-    def success(cls, data: Optional[T] = None, message: str = "Success", status_code: int = 200):
-        """Creates a successful API response"""
-        response = cls(
+    def success(cls, data: Optional[T] = None, message: str = "Success", status_code: int = 200,
+                data_type: Any = Any):
+        """Creates a successful API response.
+        Pass the type of `data` (e.g. List[PostResponse]) as `data_type` to serialize it with its compiled serializer.
+        """
+        # data has already been validated by the service layer, so the envelope is built without validating it again
+        response = envelope_model(data_type).model_construct(
             timestamp=datetime.now(TIMEZONE).isoformat(),
             status_code=status_code,
             status=HTTPStatus(status_code).phrase.replace(" ", "_").upper(),
             message=message,
-            data=data if data is not None else None
-        ).model_dump(exclude_none=True)
-        # force the response to be returned as JSON to remove none values
-        return JSONResponse(content=response, status_code=status_code)
+            data=data
+        )
+        # serialize straight to JSON bytes, dropping none values
+        content = envelope_adapter(data_type).dump_json(response, exclude_none=True)
+        return Response(content=content, status_code=status_code, media_type="application/json")
 
     @classmethod
     def error(cls, message: str, reason: Optional[str] = None, status_code: int = 400):
@@ -50,3 +56,23 @@ class BaseResponse(BaseModel, Generic[T]):
             "message": message,
             "reason": reason
         }
+
+
+@lru_cache(maxsize=None)
+def envelope_model(data_type: Any) -> type[BaseResponse]:
+    """Returns BaseResponse parameterized with data_type, built once per data type."""
+    return BaseResponse[data_type]
+
+
+@lru_cache(maxsize=None)
+def envelope_adapter(data_type: Any) -> TypeAdapter:
+    """Returns the TypeAdapter for BaseResponse[data_type], built once per data type."""
+    return TypeAdapter(envelope_model(data_type))
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    """Returns the TypeAdapter for List[model], built once per model.
+    Validating a whole list of db rows with it is a single call into pydantic-core instead of one call per row.
+    """
+    return TypeAdapter(List[model])
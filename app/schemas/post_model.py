@@ -1,3 +1,6 @@
+from datetime import date
+from typing import List
+
 from pydantic import BaseModel, Field, field_validator
 from pydantic_core.core_schema import FieldValidationInfo
 
@@ -30,3 +33,18 @@ class PostResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class DailyPostCount(BaseModel):
+    day: date
+    published: int
+    drafts: int
+
+
+class PostStatsResponse(BaseModel):
+    total: int
+    published: int
+    drafts: int
+    start: date
+    end: date
+    per_day: List[DailyPostCount]
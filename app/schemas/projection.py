@@ -0,0 +1,37 @@
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+from app.exceptions.custom_exceptions import RequestValidationException
+
+# Fields that are always returned so clients can still address the entities they list
+ALWAYS_INCLUDED_FIELDS = ("id",)
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Parses a `fields=a,b` query parameter into a tuple of field names of `model`, in the model's field order.
+    Returns None when no fields were requested, meaning the full model.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise RequestValidationException(message="Invalid fields parameter",
+                                         reason=f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                                                f"Allowed fields are: {', '.join(model.model_fields)}")
+    requested.update(ALWAYS_INCLUDED_FIELDS)
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+@lru_cache(maxsize=256)
+def projection_model(model: Type[BaseModel], fields: Optional[Tuple[str, ...]]) -> Type[BaseModel]:
+    """Builds (once per field set) a response model containing only the given fields of `model`.
+    Returns `model` itself when all of its fields are requested.
+    """
+    if fields is None or fields == tuple(model.model_fields):
+        return model
+    field_definitions = {name: (model.model_fields[name].annotation, ...) for name in fields}
+    return create_model(f"{model.__name__}Projection", __config__=ConfigDict(from_attributes=True),
+                        **field_definitions)
@@ -1,71 +1,118 @@
-from fastapi import Depends
+import logging
+
+from fastapi import Depends, BackgroundTasks
 from passlib.exc import UnknownHashError
 from sqlalchemy.orm import Session
 
-from app.database import models
-from app.database.database import get_db
+from app.database import statements
+from app.database.database import get_db, SessionLocal
 from app.exceptions.custom_exceptions import (
     InvalidCredentialsException,
     UnknownHashException,
     InternalServerError,
     ExpiredTokenException,
     InvalidTokenException,
-    TokenSignatureException
+    TokenSignatureException,
+    RevokedTokenException
 )
 from app.schemas.login_response import LoginResponseModel, TokenOwnerModel
 from app.schemas.user_model import UserLoginModel
+from app.service.invalidation_bus import invalidation_bus
+from app.service.token_revocation_service import TokenRevocationService
 from app.utils import password_util
 from app.utils.token_util import create_access_token, create_refresh_token, decode_access_token
 
 
+def rehash_password(user_id: int, old_hash: str, plain_password: str) -> None:
+    """Replaces an outdated password hash with one made with the current hashing settings.
+    Runs as a background task after the login response has been sent, so it uses its own session.
+    """
+    db = SessionLocal()
+    try:
+        new_hash = password_util.hash_password(plain_password)
+        db.execute(statements.REPLACE_USER_PASSWORD_HASH,
+                   {"user_id": user_id, "old_hash": old_hash, "new_hash": new_hash})
+        invalidation_bus.publish(db, "user", user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logging.exception(f"Failed to rehash the password of user {user_id}")
+    finally:
+        db.close()
+
+
 class AuthService:
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
+                 revocation_service: TokenRevocationService = Depends()):
+        self.background_tasks = background_tasks
         self.db = db
+        self.revocation_service = revocation_service
 
     def authenticate(self, user_credentials: UserLoginModel) -> LoginResponseModel:
         """Authenticates a user and returns an access and refresh token."""
-        user = self.db.query(models.User).filter(models.User.email == user_credentials.email).first()
+        user = self.db.execute(statements.USER_BY_EMAIL, {"email": user_credentials.email}).scalar_one_or_none()
         if not user:
+            password_util.dummy_verify(user_credentials.password)
             raise InvalidCredentialsException()
         try:
             # check whether the provided password matches the hashed password in the db
             if not password_util.verify_password(user_credentials.password, str(user.password)):
-                raise InvalidCredentialsException(reason="Invalid credentials provided!")
+                raise InvalidCredentialsException()
+            if password_util.needs_update(str(user.password)):
+                self.background_tasks.add_task(rehash_password, user.id, str(user.password), user_credentials.password)
             # Generate access and refresh tokens
             user_data = {"id": user.id, "email": user.email}
             access_token = create_access_token(user_data)
             refresh_token = create_refresh_token(user_data)
-            owner_data = TokenOwnerModel.model_validate({"id": user.id, "email": user.email}).model_dump()
-            return LoginResponseModel.model_validate({
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "owner": owner_data
-            })
+            return LoginResponseModel(access_token=access_token, refresh_token=refresh_token,
+                                      owner=TokenOwnerModel(id=user.id, email=user.email))
+        except InvalidCredentialsException:
+            raise
         except UnknownHashError:
             raise UnknownHashException()
         except Exception:
             raise InternalServerError(reason="An error occurred while processing your login request")
 
     def refresh_access_token(self, refresh_token: str) -> LoginResponseModel:
-        """Uses a refresh token to generate a new access token."""
+        """Uses a refresh token to generate a new access token.
+        The refresh token is rotated: the presented token is revoked and a new one is issued alongside the access token.
+        """
         try:
             token_data = decode_access_token(refresh_token)
             # Ensure it's actually a refresh token
             if not token_data.get("refresh"):
                 raise InvalidTokenException(reason="Invalid refresh token!")
+            if not token_data.get("jti"):
+                # issued before rotation was introduced, such a token could otherwise be exchanged forever
+                raise InvalidTokenException()
+            # Revoking is an atomic claim, so a refresh token can only ever be exchanged once
+            if not self.revocation_service.revoke_token(token_data):
+                raise RevokedTokenException(reason="Refresh token has already been used. Please log in again.")
             user_data = token_data.get("user")
             new_access_token = create_access_token(user_data)
-            owner_data = TokenOwnerModel(id=user_data["id"], email=user_data["email"]).model_dump()
-            return LoginResponseModel.model_validate({
-                "access_token": new_access_token,
-                "refresh_token": refresh_token,
-                "owner": owner_data
-            })
+            new_refresh_token = create_refresh_token(user_data)
+            return LoginResponseModel(access_token=new_access_token, refresh_token=new_refresh_token,
+                                      owner=TokenOwnerModel(id=user_data["id"], email=user_data["email"]))
         except ExpiredTokenException:
             raise ExpiredTokenException(reason="Refresh token has expired. Please log in again.")
         except InvalidTokenException:
             raise InvalidTokenException(reason="Invalid refresh token. Please log in again.")
         except TokenSignatureException:
             raise TokenSignatureException(reason="Invalid refresh token signature.")
+        except RevokedTokenException:
+            raise
         except Exception:
             raise InternalServerError(reason="An error occurred while processing your login request")
+
+    def logout(self, refresh_token: str, access_token: str) -> None:
+        """Revokes both the refresh token and the access token of the current session."""
+        refresh_data = decode_access_token(refresh_token)
+        if not refresh_data.get("refresh"):
+            raise InvalidTokenException(reason="Invalid refresh token!")
+        access_data = decode_access_token(access_token)
+        if access_data.get("refresh"):
+            raise InvalidTokenException(reason="Please provide an access token.")
+        if (refresh_data.get("user") or {}).get("id") != (access_data.get("user") or {}).get("id"):
+            raise InvalidTokenException(reason="The refresh token does not belong to the current user.")
+        self.revocation_service.revoke_token(refresh_data)
+        self.revocation_service.revoke_token(access_data)
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable
+
+from fastapi import Depends, Request
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from app.core.config import config
+from app.database import models, statements
+from app.database.database import get_db, SessionLocal
+from app.exceptions.custom_exceptions import (
+    IdempotencyKeyMismatchException,
+    IdempotencyRequestInProgressException,
+    RequestValidationException
+)
+from app.middleware.concurrency_limit import exclude_from_latency
+from app.utils.periodic import run_periodically
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Requests currently being executed by this worker, so local duplicates wait on an event instead of polling the db
+_in_flight: dict[tuple[int, str], asyncio.Event] = {}
+
+
+def request_fingerprint(method: str, path: str, body: str) -> str:
+    """Hashes what identifies a request, so a key reused for a different request can be detected."""
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+class IdempotencyService:
+    def __init__(self, db: Session = Depends(get_db), request: Request = None):
+        self.db = db
+        self.request = request
+
+    async def execute(self, user_id: int, key: str, fingerprint: str,
+                      handler: Callable[[], Awaitable[Response]]) -> Response:
+        """Runs `handler` once per (user, Idempotency-Key) and replays its stored response for repeated requests.
+        A duplicate that arrives while the first request is still running waits for it instead of running again.
+
+        `handler` must leave its writes uncommitted on this request's session: they are committed in the same
+        transaction as the stored response, so the write can never be committed without its key being completed.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise RequestValidationException(message="Invalid Idempotency-Key",
+                                             reason=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters long")
+        claim_id = self._claim(user_id, key, fingerprint)
+        if claim_id is not None:
+            return await self._run_claimed(user_id, key, claim_id, handler)
+        return await self._wait_for_response(user_id, key, fingerprint)
+
+    def _claim(self, user_id: int, key: str, fingerprint: str) -> int | None:
+        """Inserts the in-progress record for the key and returns its id. Returns None if another request already
+        holds it.
+        """
+        now = datetime.now(timezone.utc)
+        record = self.db.execute(statements.IDEMPOTENCY_KEY_BY_USER_AND_KEY,
+                                 {"user_id": user_id, "key": key}).first()
+        if record is not None:
+            abandoned = (record.status_code is None and
+                         record.created_at < now - timedelta(seconds=config.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS))
+            if record.expires_at > now and not abandoned:
+                self.db.rollback()
+                return None
+            # expired, or its first request died without finishing: start over
+            stale = delete(models.IdempotencyKey).where(models.IdempotencyKey.id == record.id)
+            if record.expires_at > now:
+                # unless the first request completed it in the meantime (its write is committed then)
+                stale = stale.where(models.IdempotencyKey.status_code.is_(None))
+            if self.db.execute(stale).rowcount == 0:
+                self.db.rollback()
+                return None
+        claim = models.IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint,
+                                      expires_at=now + timedelta(hours=config.IDEMPOTENCY_KEY_TTL_HOURS))
+        self.db.add(claim)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return None
+        return claim.id
+
+    async def _run_claimed(self, user_id: int, key: str, claim_id: int,
+                           handler: Callable[[], Awaitable[Response]]) -> Response:
+        event = _in_flight.setdefault((user_id, key), asyncio.Event())
+        try:
+            try:
+                response = await handler()
+                stored = response.status_code < 500 and self._store(claim_id, response)
+            except BaseException:
+                # nothing was committed, let a retry run the request again
+                self.db.rollback()
+                self._release(claim_id)
+                raise
+            if response.status_code >= 500:
+                self.db.rollback()
+                self._release(claim_id)
+            elif not stored:
+                raise IdempotencyRequestInProgressException(
+                    reason="This request took too long and was taken over by a retry with the same Idempotency-Key.")
+            return response
+        finally:
+            _in_flight.pop((user_id, key), None)
+            event.set()
+
+    def _store(self, claim_id: int, response: Response) -> bool:
+        """Completes the claim and commits it together with the handler's writes. Returns False, discarding the
+        writes, if the claim was taken over because this request ran for longer than IDEMPOTENCY_LOCK_TIMEOUT_SECONDS.
+        """
+        stored = self.db.execute(update(models.IdempotencyKey).where(
+            models.IdempotencyKey.id == claim_id, models.IdempotencyKey.status_code.is_(None)
+        ).values(status_code=response.status_code, response_body=response.body.decode())).rowcount
+        if not stored:
+            self.db.rollback()
+            return False
+        self.db.commit()
+        return True
+
+    def _release(self, claim_id: int) -> None:
+        # the request's own session may be unusable after the failure, so use a fresh one
+        db = SessionLocal()
+        try:
+            db.execute(delete(models.IdempotencyKey).where(
+                models.IdempotencyKey.id == claim_id, models.IdempotencyKey.status_code.is_(None)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            logging.exception(f"Failed to release Idempotency-Key claim {claim_id}")
+        finally:
+            db.close()
+
+    async def _wait_for_response(self, user_id: int, key: str, fingerprint: str) -> Response:
+        if self.request is not None:
+            # waiting for another request says nothing about how loaded this worker is
+            exclude_from_latency(self.request.scope)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+        poll_interval = config.IDEMPOTENCY_POLL_INTERVAL_MS / 1000
+        while True:
+            record = self.db.execute(statements.IDEMPOTENCY_KEY_BY_USER_AND_KEY,
+                                     {"user_id": user_id, "key": key}).first()
+            self.db.rollback()
+            if record is None:
+                # the first request failed and released the key, so this one can run it
+                raise IdempotencyRequestInProgressException(
+                    reason="The original request with this Idempotency-Key failed. Please retry.")
+            if record.request_hash != fingerprint:
+                raise IdempotencyKeyMismatchException()
+            if record.status_code is not None:
+                return Response(content=record.response_body, status_code=record.status_code,
+                                media_type="application/json", headers={REPLAYED_HEADER: "true"})
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise IdempotencyRequestInProgressException()
+            event = _in_flight.get((user_id, key))
+            if event is not None:
+                # the first request runs in this worker: wake up as soon as it finishes
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(poll_interval, remaining))
+
+    def purge_expired(self) -> int:
+        """Deletes stored responses whose keys have expired. Returns the number of rows removed."""
+        result = self.db.execute(
+            delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+        self.db.commit()
+        return result.rowcount
+
+
+def _purge_expired_keys() -> None:
+    db = SessionLocal()
+    try:
+        IdempotencyService(db).purge_expired()
+    finally:
+        db.close()
+
+
+async def run_idempotency_maintenance(interval_seconds: int = 60 * 60) -> None:
+    """Background loop that removes expired idempotency keys."""
+    await run_periodically(_purge_expired_keys, interval_seconds, "purge expired idempotency keys")
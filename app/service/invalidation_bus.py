@@ -0,0 +1,138 @@
+import json
+import logging
+import select
+import threading
+from typing import Callable, Hashable
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.utils.cache import LocalCache
+
+CHANNEL = "chatterbox_invalidation"
+
+
+class InvalidationBus:
+    """Keeps the in-process caches of all workers coherent using postgres LISTEN/NOTIFY.
+
+    Writers call `publish` inside the transaction that changes an entity, so the notification is only delivered if
+    that transaction commits. Every worker runs one listener thread holding a dedicated LISTEN connection that evicts
+    the matching entry from its local cache. Caches are only enabled while that connection is up; they are emptied
+    whenever it is (re)established so nothing missed during a disconnect is served afterwards.
+
+    Other per-worker state can follow changes too: `publish_event` delivers an event to the listener registered for
+    its entity with `register_listener`. Such listeners must catch up on their own after a disconnect.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANNEL, poll_timeout_seconds: float = 5,
+                 reconnect_delay_seconds: float = 1):
+        self.dsn = dsn
+        self.channel = channel
+        self.poll_timeout_seconds = poll_timeout_seconds
+        self.reconnect_delay_seconds = reconnect_delay_seconds
+        self._caches: dict[str, LocalCache] = {}
+        self._listeners: dict[str, Callable[[dict], None]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def register_cache(self, entity: str, cache: LocalCache) -> LocalCache:
+        self._caches[entity] = cache
+        return cache
+
+    def register_listener(self, entity: str, listener: Callable[[dict], None]) -> None:
+        """Calls `listener` with every event published for `entity`, in the listener thread."""
+        self._listeners[entity] = listener
+
+    def publish(self, db: Session | Connection, entity: str, key: Hashable) -> None:
+        """Queues an invalidation for `entity` `key` on the current transaction and evicts it locally."""
+        cache = self._caches.get(entity)
+        if cache is not None:
+            cache.evict(key)
+        self._notify(db, {"entity": entity, "key": key})
+
+    def publish_clear(self, db: Session | Connection, entity: str) -> None:
+        """Queues clearing the whole `entity` cache on the current transaction, for writes that change many or
+        unknown rows (bulk imports, detached partitions), and clears it locally.
+        """
+        cache = self._caches.get(entity)
+        if cache is not None:
+            cache.clear()
+        self._notify(db, {"entity": entity, "clear": True})
+
+    def publish_event(self, db: Session | Connection, entity: str, **fields) -> None:
+        """Queues an event for the listener of `entity` on the current transaction. Every worker receives it once
+        the transaction commits.
+        """
+        self._notify(db, {"entity": entity, **fields})
+
+    def _notify(self, db: Session | Connection, event: dict) -> None:
+        dialect = db.dialect if isinstance(db, Connection) else db.get_bind().dialect
+        if dialect.name == "postgresql":
+            db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": self.channel, "payload": json.dumps(event)})
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else self.poll_timeout_seconds + 1)
+            self._thread = None
+        self._set_caches_enabled(False)
+
+    def _set_caches_enabled(self, enabled: bool) -> None:
+        for cache in self._caches.values():
+            cache.enabled = enabled
+            cache.clear()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            listener = self._listeners.get(event["entity"])
+            if listener is not None:
+                listener(event)
+                return
+            cache = self._caches.get(event["entity"])
+            if cache is None:
+                return
+            if event.get("clear"):
+                cache.clear()
+            else:
+                cache.evict(event["key"])
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"Ignoring malformed invalidation event: {payload}")
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                # resync: anything cached before this point may have changed while we were not listening
+                self._set_caches_enabled(True)
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], self.poll_timeout_seconds) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._dispatch(connection.notifies.pop(0).payload)
+            except Exception:
+                logging.exception("Cache invalidation listener lost its connection, caches disabled until it is back")
+                self._set_caches_enabled(False)
+                self._stop.wait(self.reconnect_delay_seconds)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+invalidation_bus = InvalidationBus(config.database_url)
+user_cache = invalidation_bus.register_cache("user", LocalCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS))
+post_cache = invalidation_bus.register_cache("post", LocalCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS))
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import List
+
+from sqlalchemy import insert
+
+from app.core.config import config
+from app.database import models
+from app.database.database import SessionLocal
+from app.exceptions.custom_exceptions import ServiceUnavailableException, ChatterBoxException, InternalServerError
+from app.schemas.base_response import list_adapter
+from app.schemas.post_model import PostModel, PostResponse
+from app.service.post_service import PostService
+
+# Marks the end of the queue when the writer is stopped
+_STOP = object()
+
+
+def _insert_posts(posts: List[PostModel]) -> List[PostResponse]:
+    """Inserts all posts with a single multi-row INSERT ... RETURNING in one transaction."""
+    db = SessionLocal()
+    try:
+        statement = insert(models.Post).returning(
+            models.Post.id, models.Post.title, models.Post.content, models.Post.published,
+            sort_by_parameter_order=True
+        )
+        rows = db.execute(statement, [post.model_dump() for post in posts]).all()
+        db.commit()
+        return list_adapter(PostResponse).validate_python(rows, from_attributes=True)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _insert_posts_one_by_one(posts: List[PostModel]) -> List[PostResponse | Exception]:
+    """Inserts each post in its own transaction, so a bad row only fails its own request."""
+    results = []
+    db = SessionLocal()
+    try:
+        service = PostService(db)
+        for post in posts:
+            try:
+                results.append(service.create_post(post))
+            except ChatterBoxException as e:
+                results.append(e)
+            except Exception as e:
+                results.append(InternalServerError(reason=str(e)))
+    finally:
+        db.close()
+    return results
+
+
+class PostBatchWriter:
+    """Queues post creates and flushes them in micro-batches from a background task.
+
+    A batch is flushed when it reaches `max_batch_size` posts or `flush_interval_ms` after its first post arrived,
+    whichever comes first. Every caller waits for and receives its own row, or its own error. The queue is bounded:
+    when it stays full for `enqueue_timeout_ms` the caller is turned away with a 503.
+    """
+
+    def __init__(self, max_batch_size: int = config.POST_WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval_ms: int = config.POST_WRITE_BEHIND_FLUSH_INTERVAL_MS,
+                 max_queue_size: int = config.POST_WRITE_BEHIND_MAX_QUEUE_SIZE,
+                 enqueue_timeout_ms: int = config.POST_WRITE_BEHIND_ENQUEUE_TIMEOUT_MS):
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops accepting posts and waits until everything already queued has been written."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, post: PostModel) -> PostResponse:
+        """Queues a post and waits until it has been written. Returns the created post."""
+        if not self.running:
+            raise ServiceUnavailableException(reason="Posts cannot be created right now. Please try again shortly.")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((post, future)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableException(reason="Too many posts are waiting to be written. Please retry shortly.")
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+        # posts that were queued while stopping still get written
+        leftovers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            await self._flush(leftovers)
+
+    async def _flush(self, batch: list) -> None:
+        posts = [post for post, _ in batch]
+        try:
+            results = await asyncio.to_thread(_insert_posts, posts)
+        except Exception:
+            logging.exception(f"Batch insert of {len(posts)} posts failed, retrying them one by one")
+            results = await asyncio.to_thread(_insert_posts_one_by_one, posts)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                # the caller went away (e.g. the request was cancelled)
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+post_batch_writer = PostBatchWriter()
@@ -1,39 +1,94 @@
-from typing import List
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 
 from fastapi import Depends
+from pydantic import BaseModel
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
-from app.database import models
+from app.core.config import config
+from app.database import models, statements
 from app.database.database import get_db
 from app.exceptions.custom_exceptions import (
     EntityNotFoundException,
     DatabaseConnectionException,
     DatabaseTimeoutException,
-    InternalServerError
+    InternalServerError,
+    RequestValidationException
 )
-from app.schemas.post_model import PostResponse, PostModel
+from app.schemas.base_response import list_adapter
+from app.schemas.post_model import DailyPostCount, PostResponse, PostModel, PostStatsResponse
+from app.schemas.projection import projection_model
+from app.service.invalidation_bus import invalidation_bus, post_cache
 
 
 class PostService:
     def __init__(self, db: Session = Depends(get_db)):
         self.db = db
 
-    def get_all_posts(self) -> List[PostResponse]:
-        posts = self.db.query(models.Post).all()
-        return [PostResponse.model_validate(post) for post in posts]
+    def get_all_posts(self, fields: Optional[Tuple[str, ...]] = None, created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None) -> List[BaseModel]:
+        """Returns all posts. When `fields` is given only those columns are selected from the db.
+        `created_after` and `created_before` bound the created_at window, which lets postgres skip the monthly
+        partitions outside of it.
+        """
+        response_model = projection_model(PostResponse, fields)
+        statement = statements.post_list(tuple(response_model.model_fields), created_after is not None,
+                                          created_before is not None)
+        parameters = {"created_after": created_after, "created_before": created_before}
+        # validate the row tuples in one go instead of loading ORM entities and validating them one by one
+        rows = self.db.execute(statement, parameters).all()
+        return list_adapter(response_model).validate_python(rows, from_attributes=True)
 
     def get_post_by_id(self, post_id: int) -> PostResponse:
-        post = self.db.query(models.Post).filter(models.Post.id == post_id).first()
+        cached = post_cache.get(post_id)
+        if cached is not None:
+            return cached
+        generation = post_cache.generation()
+        post = self._find_post(post_id)
+        response = PostResponse.model_validate(post)
+        post_cache.set(post_id, response, generation)
+        return response
+
+    def _find_post(self, post_id: int) -> models.Post:
+        post = self.db.execute(statements.POST_BY_ID, {"post_id": post_id}).scalar_one_or_none()
         if not post:
             raise EntityNotFoundException(entity_name="Post", identifier=post_id)
-        return PostResponse.model_validate(post)
+        return post
 
-    def create_post(self, post: PostModel) -> PostResponse:
+    def get_stats(self, start: Optional[date] = None, end: Optional[date] = None) -> PostStatsResponse:
+        """Returns the post totals and the per-day counts between `start` and `end` (inclusive, UTC days) from the
+        rollup tables, without reading the posts themselves.
+        """
+        end = end or datetime.now(timezone.utc).date()
+        start = start or end - timedelta(days=config.POST_STATS_DEFAULT_DAYS - 1)
+        if start > end:
+            raise RequestValidationException(message="Invalid date range", reason="start must not be after end")
+        if (end - start).days >= config.POST_STATS_MAX_DAYS:
+            raise RequestValidationException(message="Invalid date range",
+                                             reason=f"The range cannot span more than {config.POST_STATS_MAX_DAYS} days")
+        totals = dict(self.db.execute(statements.POST_STATS_TOTALS).all())
+        per_day = {start + timedelta(days=offset): [0, 0] for offset in range((end - start).days + 1)}
+        for day, published, post_count in self.db.execute(statements.POST_DAILY_STATS_BETWEEN,
+                                                            {"start": start, "end": end}):
+            per_day[day][0 if published else 1] = post_count
+        published, drafts = totals.get(True, 0), totals.get(False, 0)
+        return PostStatsResponse(
+            total=published + drafts, published=published, drafts=drafts, start=start, end=end,
+            per_day=[DailyPostCount(day=day, published=counts[0], drafts=counts[1]) for day, counts in per_day.items()]
+        )
+
+    def create_post(self, post: PostModel, commit: bool = True) -> PostResponse:
+        """Inserts the post. With `commit=False` it is only flushed, and the caller commits it (e.g. together with the
+        stored response of an Idempotency-Key).
+        """
         try:
             new_post = models.Post(**post.model_dump())
             self.db.add(new_post)
-            self.db.commit()
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
             self.db.refresh(new_post)
             return PostResponse.model_validate(new_post)
         except OperationalError:
@@ -47,9 +102,7 @@ class PostService:
             raise InternalServerError(reason=str(e))
 
     def update_post(self, post_id: int, updated_post: PostModel) -> PostResponse:
-        post = self.db.query(models.Post).filter(models.Post.id == post_id).first()
-        if not post:
-            raise EntityNotFoundException(entity_name="Post", identifier=post_id)
+        post = self._find_post(post_id)
         updated_data = updated_post.model_dump()
         # Trim off spaces for title and content if they exist
         updated_data["title"] = updated_data.get('title').strip() if "title" in updated_data else None
@@ -57,14 +110,14 @@ class PostService:
 
         for field, value in updated_data.items():
             setattr(post, field, value)
+        invalidation_bus.publish(self.db, "post", post_id)
         self.db.commit()
         self.db.refresh(post)
         return PostResponse.model_validate(post)
 
     def delete_post(self, post_id: int) -> PostResponse:
-        post = self.db.query(models.Post).filter(models.Post.id == post_id).first()
-        if not post:
-            raise EntityNotFoundException(entity_name="Post", identifier=post_id)
+        post = self._find_post(post_id)
         self.db.delete(post)
+        invalidation_bus.publish(self.db, "post", post_id)
         self.db.commit()
         return PostResponse.model_validate(post)
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone, timedelta
+
+from fastapi import Depends
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.database import models
+from app.database.database import get_db, SessionLocal
+from app.exceptions.custom_exceptions import InvalidTokenException
+from app.service.invalidation_bus import invalidation_bus
+from app.utils.periodic import run_periodically
+from app.utils.revocation_store import revocation_store
+
+REVOCATION_EVENT = "revoked_token"
+
+
+class TokenRevocationService:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def revoke_token(self, token_data: dict) -> bool:
+        """Revokes a decoded token until its expiry.
+        Returns False if the token had already been revoked, which makes revocation an atomic claim on the token.
+
+        Access token revocations are pushed to the revocation store of every worker when the transaction commits.
+        Refresh tokens are only ever checked through this claim, so they are not kept in memory.
+        """
+        jti = token_data.get("jti")
+        if not jti:
+            # Tokens issued before revocation was introduced carry no id, so they cannot be revoked or rotated
+            raise InvalidTokenException(reason="This token can no longer be used. Please log in again.")
+        expires_at = float(token_data["exp"])
+        refresh = bool(token_data.get("refresh"))
+        try:
+            self.db.add(models.RevokedToken(jti=jti, expires_at=datetime.fromtimestamp(expires_at, tz=timezone.utc),
+                                            refresh=refresh))
+            if not refresh:
+                invalidation_bus.publish_event(self.db, REVOCATION_EVENT, jti=jti, expires_at=expires_at)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            claimed = False
+        else:
+            claimed = True
+        if not refresh:
+            revocation_store.revoke(jti, expires_at)
+        return claimed
+
+    def sync_store(self, since: datetime | None = None) -> int:
+        """Loads unexpired access token revocations (optionally only those revoked after `since`) into the in-memory
+        store. Catches up on revocations whose event was missed, e.g. while the invalidation bus was reconnecting.
+        """
+        statement = select(models.RevokedToken.jti, models.RevokedToken.expires_at).where(
+            models.RevokedToken.expires_at > datetime.now(timezone.utc), models.RevokedToken.refresh.is_(False))
+        if since is not None:
+            statement = statement.where(models.RevokedToken.revoked_at >= since)
+        rows = self.db.execute(statement).all()
+        revocation_store.load((jti, expires_at.timestamp()) for jti, expires_at in rows)
+        return len(rows)
+
+    def purge_expired(self) -> int:
+        """Deletes revocations for tokens that have expired on their own. Returns the number of rows removed."""
+        result = self.db.execute(
+            delete(models.RevokedToken).where(models.RevokedToken.expires_at <= datetime.now(timezone.utc)))
+        self.db.commit()
+        revocation_store.purge_expired()
+        return result.rowcount
+
+
+def _sync_and_purge(since: datetime | None) -> None:
+    db = SessionLocal()
+    try:
+        service = TokenRevocationService(db)
+        service.sync_store(since)
+        service.purge_expired()
+    finally:
+        db.close()
+
+
+def _apply_revocation_event(event: dict) -> None:
+    revocation_store.revoke(event["jti"], float(event["expires_at"]))
+
+
+invalidation_bus.register_listener(REVOCATION_EVENT, _apply_revocation_event)
+
+
+async def run_revocation_maintenance(interval_seconds: int = config.REVOCATION_SYNC_INTERVAL_SECONDS) -> None:
+    """Background loop that keeps this worker's revocation store in sync with the db and purges expired entries."""
+    since = None
+
+    def sync_and_purge():
+        nonlocal since
+        # overlap the windows slightly so revocations committed while syncing are not missed
+        started_at = datetime.now(timezone.utc) - timedelta(seconds=interval_seconds)
+        _sync_and_purge(since)
+        since = started_at
+
+    await run_periodically(sync_and_purge, interval_seconds, "sync the token revocation store")
@@ -1,11 +1,11 @@
-from typing import List
+from typing import List, Optional, Tuple
 
 from fastapi.params import Depends
-from pydantic import EmailStr
+from pydantic import EmailStr, BaseModel
 from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
 
-from app.database import models
+from app.database import models, statements
 from app.database.database import get_db
 from app.database.models import User
 from app.exceptions.custom_exceptions import (
@@ -16,6 +16,9 @@ from app.exceptions.custom_exceptions import (
     DatabaseTimeoutException,
     InternalServerError
 )
+from app.schemas.base_response import list_adapter
+from app.schemas.projection import projection_model
+from app.service.invalidation_bus import user_cache
 from app.schemas.user_model import UserResponseModel, UserCreateModel
 from app.utils import password_util
 
@@ -24,26 +27,38 @@ class UserService:
     def __init__(self, db: Session = Depends(get_db)):
         self.db = db
 
-    def get_all_users(self) -> List[UserResponseModel]:
-        users = self.db.query(models.User).all()
-        return [UserResponseModel.model_validate(user) for user in users]
+    def get_all_users(self, fields: Optional[Tuple[str, ...]] = None) -> List[BaseModel]:
+        """Returns all users. When `fields` is given only those columns are selected from the db."""
+        response_model = projection_model(UserResponseModel, fields)
+        # validate the row tuples in one go instead of loading ORM entities and validating them one by one
+        rows = self.db.execute(statements.user_list(tuple(response_model.model_fields))).all()
+        return list_adapter(response_model).validate_python(rows, from_attributes=True)
 
     def get_user_by_id(self, user_id: int) -> UserResponseModel:
-        user = self.db.query(User).filter(User.id == user_id).first()
+        # served from the worker's cache when possible, as this runs for every authenticated request
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        user = self.db.execute(statements.USER_BY_ID, {"user_id": user_id}).scalar_one_or_none()
         if not user:
             raise EntityNotFoundException(entity_name="User", identifier=user_id)
-        return UserResponseModel.model_validate(user)
+        response = UserResponseModel.model_validate(user)
+        user_cache.set(user_id, response, generation)
+        return response
 
     def get_user_by_email(self, email: EmailStr) -> User | None:
         """Fetch a user by email. Returns None if not found"""
-        return self.db.query(User).filter(User.email == email).first()
+        return self.db.execute(statements.USER_BY_EMAIL, {"email": email}).scalar_one_or_none()
 
     def user_exists(self, email: EmailStr) -> bool:
         """Check if a user with the given email exists."""
-        user = self.get_user_by_email(email)
-        return True if user is not None else False
+        return self.db.execute(statements.USER_ID_BY_EMAIL, {"email": email}).first() is not None
 
-    def create_user(self, user: UserCreateModel) -> UserResponseModel:
+    def create_user(self, user: UserCreateModel, commit: bool = True) -> UserResponseModel:
+        """Inserts the user. With `commit=False` it is only flushed, and the caller commits it (e.g. together with the
+        stored response of an Idempotency-Key).
+        """
         # check if user already exists
         if self.user_exists(user.email):
             raise UserAlreadyExistsException(email=user.email)
@@ -55,7 +70,10 @@ class UserService:
             # converts this Pydantic user object into a dictionary.
             new_user = models.User(**updated_data)
             self.db.add(new_user)
-            self.db.commit()
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
             self.db.refresh(new_user)
             return UserResponseModel.model_validate(new_user)
 
@@ -7,10 +7,11 @@ from fastapi.responses import JSONResponse
 TIMEZONE = ZoneInfo('Etc/GMT-3')
 
 
-def create_error_response(status_code: int, message: str, reason: str) -> JSONResponse:
+def create_error_response(status_code: int, message: str, reason: str, headers: dict = None) -> JSONResponse:
     """Generates a consistent JSON error response."""
     return JSONResponse(
         status_code=status_code,
+        headers=headers,
         content={
             "timestamp": datetime.now(TIMEZONE).isoformat(),
             "status_code": status_code,
@@ -1,6 +1,40 @@
+from functools import lru_cache
+
 from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+
+from app.core.config import config
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_password_context() -> CryptContext:
+    """Builds the hashing context from Settings.
+    Costs are pinned (min == max), so a hash made with different costs is reported by `needs_update`.
+    Fails if a configured scheme has no backend installed, rather than failing every hash and rehash at runtime.
+    """
+    options = {}
+    if "bcrypt" in config.PASSWORD_SCHEMES:
+        options.update(bcrypt__default_rounds=config.BCRYPT_ROUNDS, bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+                       bcrypt__max_rounds=config.BCRYPT_ROUNDS)
+    if "pbkdf2_sha256" in config.PASSWORD_SCHEMES:
+        options.update(pbkdf2_sha256__default_rounds=config.PBKDF2_SHA256_ROUNDS,
+                       pbkdf2_sha256__min_rounds=config.PBKDF2_SHA256_ROUNDS,
+                       pbkdf2_sha256__max_rounds=config.PBKDF2_SHA256_ROUNDS)
+    if "argon2" in config.PASSWORD_SCHEMES:
+        options.update(argon2__time_cost=config.ARGON2_TIME_COST, argon2__memory_cost=config.ARGON2_MEMORY_COST_KIB,
+                       argon2__parallelism=config.ARGON2_PARALLELISM)
+    context = CryptContext(schemes=config.PASSWORD_SCHEMES, deprecated="auto", **options)
+    for scheme in config.PASSWORD_SCHEMES:
+        handler = context.handler(scheme)
+        if hasattr(handler, "get_backend"):
+            try:
+                handler.get_backend()
+            except MissingBackendError:
+                raise RuntimeError(f"Password scheme {scheme} is configured in PASSWORD_SCHEMES but has no backend "
+                                   f"installed (see requirements.txt)")
+    return context
+
+
+pwd_context = build_password_context()
 
 
 def hash_password(password: str) -> str:
@@ -9,3 +43,18 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def needs_update(hashed_password: str) -> bool:
+    """Returns True if the hash uses a deprecated scheme or other costs than configured."""
+    return pwd_context.needs_update(hashed_password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return pwd_context.hash("chatterbox-dummy-password")
+
+
+def dummy_verify(plain_password: str) -> None:
+    """Runs a verify of the same cost as a real one, so unknown users cannot be told apart by response time."""
+    pwd_context.verify(plain_password, _dummy_hash())
@@ -0,0 +1,15 @@
+import asyncio
+import logging
+from typing import Any, Callable
+
+
+async def run_periodically(fn: Callable[[], Any], interval_seconds: float, name: str) -> None:
+    """Runs the blocking `fn` in a thread right away and then every `interval_seconds`, until cancelled.
+    A failed run is logged as "Failed to <name>" and does not stop the loop.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(fn)
+        except Exception:
+            logging.exception(f"Failed to {name}")
+        await asyncio.sleep(interval_seconds)
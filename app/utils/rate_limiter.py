@@ -0,0 +1,75 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app.core.config import config
+from app.exceptions.custom_exceptions import TooManyRequestsException
+
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets. Implement this on a shared store (e.g. Redis) to limit across workers."""
+
+    @abstractmethod
+    def consume(self, key: str, capacity: int, refill_per_second: float, cost: float = 1) -> float:
+        """Takes `cost` tokens from the bucket identified by `key`.
+        Returns 0 if the tokens were taken, otherwise the number of seconds until enough tokens are available.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process token buckets. The least recently used buckets are dropped once `max_keys` is reached."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_per_second: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class LoginRateLimiter:
+    """Throttles login attempts per client ip and per email address."""
+
+    def __init__(self, backend: RateLimitBackend,
+                 ip_capacity: int = config.LOGIN_RATE_LIMIT_IP_CAPACITY,
+                 ip_refill_per_minute: float = config.LOGIN_RATE_LIMIT_IP_REFILL_PER_MINUTE,
+                 email_capacity: int = config.LOGIN_RATE_LIMIT_EMAIL_CAPACITY,
+                 email_refill_per_minute: float = config.LOGIN_RATE_LIMIT_EMAIL_REFILL_PER_MINUTE):
+        self.backend = backend
+        self.ip_capacity = ip_capacity
+        self.ip_refill_per_second = ip_refill_per_minute / 60
+        self.email_capacity = email_capacity
+        self.email_refill_per_second = email_refill_per_minute / 60
+
+    def check(self, ip: str | None, email: str) -> None:
+        """Raises TooManyRequestsException if either the ip or the email has run out of attempts."""
+        retry_after = self.backend.consume(f"login:email:{email.lower()}", self.email_capacity,
+                                           self.email_refill_per_second)
+        if ip:
+            retry_after = max(retry_after, self.backend.consume(f"login:ip:{ip}", self.ip_capacity,
+                                                                self.ip_refill_per_second))
+        if retry_after > 0:
+            raise TooManyRequestsException(retry_after=retry_after,
+                                           reason="Too many login attempts. Please try again later.")
+
+
+login_rate_limiter = LoginRateLimiter(InMemoryRateLimitBackend())
+
+
+def set_rate_limit_backend(backend: RateLimitBackend) -> None:
+    """Swaps the backend used by the login rate limiter, e.g. for a store shared between workers."""
+    login_rate_limiter.backend = backend
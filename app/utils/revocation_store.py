@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import Iterable, Tuple
+
+
+class RevocationStore:
+    """In-memory set of revoked token ids (jti) kept per worker.
+
+    The revoked_tokens table is the source of truth; this store mirrors the unexpired part of it so that
+    checking a token on every authenticated request is a dictionary lookup rather than a db round-trip.
+    """
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        """Marks a token id as revoked until its own expiry timestamp."""
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str | None) -> bool:
+        """Returns True if the token id has been revoked and the token has not yet expired."""
+        if not jti:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def load(self, entries: Iterable[Tuple[str, float]]) -> None:
+        """Merges (jti, expires_at) pairs read from the db into the store."""
+        with self._lock:
+            self._revoked.update(entries)
+
+    def purge_expired(self) -> int:
+        """Drops entries whose tokens have expired anyway. Returns the number of entries removed."""
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            for jti in expired:
+                del self._revoked[jti]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocation_store = RevocationStore()
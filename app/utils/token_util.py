@@ -1,4 +1,5 @@
 import logging
+import uuid
 from datetime import timedelta, datetime
 
 import jwt
@@ -12,9 +13,11 @@ from app.exceptions.custom_exceptions import (
     ExpiredTokenException,
     TokenSignatureException,
     InvalidAuthorizationHeaderException,
-    EntityNotFoundException
+    EntityNotFoundException,
+    RevokedTokenException
 )
 from app.service.user_service import UserService
+from app.utils.revocation_store import revocation_store
 
 SECRET_KEY = config.SECRET_KEY
 JWT_ALGORITHM = config.ALGORITHM
@@ -28,6 +31,7 @@ def create_access_token(user_data: dict, expiry: timedelta = None, refresh_token
         "user": user_data,
         "exp": (datetime.now() + (expiry if expiry else timedelta(minutes=EXPIRY_TIME_MINUTES))).timestamp(),
         "iat": datetime.now().timestamp(),
+        "jti": uuid.uuid4().hex,
         "refresh": refresh_token
     }
     access_token = jwt.encode(payload=payload, key=SECRET_KEY, algorithm=JWT_ALGORITHM)
@@ -76,6 +80,8 @@ def get_current_user(token: str = Depends(get_token_from_header), user_service:
     payload = decode_access_token(token)
     if payload.get("refresh"):
         raise InvalidTokenException(reason="Please provide an access token.")
+    if revocation_store.is_revoked(payload.get("jti")):
+        raise RevokedTokenException()
     user_data = payload.get("user")
     if not user_data:
         # id identifier is not accessible since there is no user, so use 0 since there will be no ID 0 in db
@@ -0,0 +1,67 @@
+"""Bytes on the wire and CPU cost of response compression, per response size.
+
+Builds BaseResponse-shaped post list envelopes of increasing size and compresses them with every encoder the
+CompressionMiddleware can negotiate, at a few levels.
+
+Usage:
+    python -m benchmarks.compression_bench [--repeat 50]
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+from app.middleware.compression import GzipEncoder, BrotliEncoder, brotli
+
+WORDS = ["".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(2000)]
+
+
+def build_envelope(post_count: int) -> bytes:
+    posts = [
+        {
+            "id": index,
+            "title": " ".join(random.choices(WORDS, k=6)),
+            "content": " ".join(random.choices(WORDS, k=80)),
+            "published": index % 3 != 0,
+        }
+        for index in range(1, post_count + 1)
+    ]
+    return json.dumps({
+        "timestamp": "2026-10-19T10:00:00+03:00",
+        "status_code": 200,
+        "status": "OK",
+        "message": "Posts retrieved successfully",
+        "data": posts,
+    }).encode()
+
+
+def measure(create_encoder, body: bytes, repeat: int) -> tuple[int, float]:
+    size = 0
+    started = time.process_time()
+    for _ in range(repeat):
+        encoder = create_encoder()
+        size = len(encoder.compress(body) + encoder.finish())
+    return size, (time.process_time() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="compressions per measurement")
+    args = parser.parse_args()
+
+    encoders = {f"gzip-{level}": (lambda level=level: GzipEncoder(level)) for level in (1, 6, 9)}
+    if brotli is not None:
+        encoders.update({f"br-{quality}": (lambda quality=quality: BrotliEncoder(quality)) for quality in (1, 4, 9)})
+
+    print(f"{'posts':>6} {'raw bytes':>10} {'encoder':>8} {'wire bytes':>11} {'ratio':>6} {'cpu ms':>8}")
+    for post_count in (1, 10, 100, 1000, 10000):
+        body = build_envelope(post_count)
+        repeat = max(1, args.repeat // max(1, post_count // 100))
+        for name, create_encoder in encoders.items():
+            size, cpu_ms = measure(create_encoder, body, repeat)
+            print(f"{post_count:>6} {len(body):>10} {name:>8} {size:>11} {len(body) / size:>6.1f} {cpu_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
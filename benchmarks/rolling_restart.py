@@ -0,0 +1,134 @@
+"""Failed requests during rolling restarts of the production server, under load.
+
+Starts `python -m app.cli.serve` on its own port, keeps it under load with a mix of reads and writes of posts over
+keep-alive connections, restarts every worker a few times with SIGHUP and finally stops the server with SIGTERM.
+Every request that does not get a 2xx response (including connection errors) counts as failed; the script exits with
+status 1 if there were any, or if the server leaves connections to the database open after it stopped.
+
+The load clients expire idle connections before the server does (as load balancers and HTTP clients should), so
+connections are never closed by the client and the server at the same time.
+
+Needs a database configured as for the app and an existing user to log in with.
+
+Usage:
+    python -m benchmarks.rolling_restart --email user@example.com --password secret [--workers 4] [--clients 16]
+        [--restarts 3] [--restart-every 5]
+"""
+import argparse
+import asyncio
+import collections
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import text
+
+from app.core.config import config
+from app.database.database import engine
+
+
+def other_db_connections() -> int:
+    with engine.connect() as connection:
+        count = connection.execute(text(
+            "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )).scalar()
+    engine.dispose()
+    return count
+
+
+async def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                await client.get("/docs")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def run_client(client: httpx.AsyncClient, headers: dict, post_id: int, stop: asyncio.Event,
+                     results: collections.Counter, errors: collections.Counter) -> None:
+    index = 0
+    while not stop.is_set():
+        index += 1
+        try:
+            if index % 4 == 0:
+                response = await client.post("/posts", headers=headers,
+                                             json={"title": "Rolling restart", "content": f"Request {index}"})
+            elif index % 4 == 1:
+                response = await client.get("/posts/stats", headers=headers)
+            else:
+                response = await client.get(f"/posts/{post_id}", headers=headers)
+        except httpx.TransportError as error:
+            results["failed"] += 1
+            errors[type(error).__name__] += 1
+            continue
+        if response.is_success:
+            results["ok"] += 1
+        else:
+            results["failed"] += 1
+            errors[f"HTTP {response.status_code}"] += 1
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--restarts", type=int, default=3)
+    parser.add_argument("--restart-every", type=float, default=5, help="seconds between rolling restarts")
+    args = parser.parse_args()
+
+    connections_before = other_db_connections()
+    environment = {**os.environ, "SERVER_PORT": str(args.port), "SERVER_WORKERS": str(args.workers)}
+    server = subprocess.Popen([sys.executable, "-m", "app.cli.serve"], env=environment)
+    base_url = f"http://127.0.0.1:{args.port}"
+    results, errors = collections.Counter(), collections.Counter()
+    try:
+        await wait_until_up(base_url)
+        limits = httpx.Limits(max_connections=args.clients,
+                              keepalive_expiry=max(1, config.SERVER_KEEP_ALIVE_SECONDS - 2))
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            login = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+            created = await client.post("/posts", headers=headers,
+                                        json={"title": "Rolling restart", "content": "Read by the load clients"})
+            created.raise_for_status()
+            post_id = created.json()["data"]["id"]
+            stop = asyncio.Event()
+            clients = [asyncio.create_task(run_client(client, headers, post_id, stop, results, errors))
+                       for _ in range(args.clients)]
+            for restart in range(args.restarts):
+                await asyncio.sleep(args.restart_every)
+                print(f"Rolling restart {restart + 1}/{args.restarts} after {sum(results.values())} requests",
+                      file=sys.stderr)
+                server.send_signal(signal.SIGHUP)
+            await asyncio.sleep(args.restart_every)
+            stop.set()
+            await asyncio.gather(*clients)
+    finally:
+        stopped_at = time.monotonic()
+        server.send_signal(signal.SIGTERM)
+        exit_code = server.wait()
+        shutdown_seconds = time.monotonic() - stopped_at
+
+    leftover_connections = other_db_connections() - connections_before
+    print(f"requests: {sum(results.values())}, ok: {results['ok']}, failed: {results['failed']}")
+    for error, count in errors.most_common():
+        print(f"  {error}: {count}")
+    print(f"server exited with status {exit_code} in {shutdown_seconds:.1f}s, "
+          f"db connections left open: {max(0, leftover_connections)}")
+    return 1 if results["failed"] or leftover_connections > 0 or exit_code != 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,75 @@
+"""Per-row cost of validating and serializing list responses, before and after reusing compiled adapters.
+
+"before" is how list endpoints used to respond: load ORM entities, PostResponse.model_validate per row, validate the
+BaseResponse envelope, model_dump it and let JSONResponse run json.dumps. "after" selects the columns as row tuples,
+validates them with one cached List[PostResponse] adapter call and dumps the envelope to JSON in pydantic-core.
+
+Rows come from an in-memory sqlite database so the numbers only contain Python/pydantic overhead.
+
+Usage:
+    python -m benchmarks.serialization_bench [--rows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+
+from app.database import models
+from app.schemas.base_response import BaseResponse, list_adapter
+from app.schemas.post_model import PostResponse
+
+
+def respond_before(db: Session) -> bytes:
+    posts = db.query(models.Post).all()
+    data = [PostResponse.model_validate(post) for post in posts]
+    response = BaseResponse(timestamp="2026-10-19T10:00:00+03:00", status_code=200, status="OK",
+                            message="Posts retrieved successfully", data=data).model_dump(exclude_none=True)
+    return JSONResponse(content=response).body
+
+
+def respond_after(db: Session) -> bytes:
+    columns = [getattr(models.Post, field) for field in PostResponse.model_fields]
+    rows = db.execute(select(*columns)).all()
+    data = list_adapter(PostResponse).validate_python(rows, from_attributes=True)
+    return BaseResponse.success(data=data, message="Posts retrieved successfully", data_type=List[PostResponse]).body
+
+
+def measure(respond, engine, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with Session(engine) as db:
+            started = time.perf_counter()
+            respond(db)
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    created_at = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        # sqlite cannot autoincrement the composite (id, created_at) key, so the table is declared by hand
+        connection.execute(text("CREATE TABLE posts (id INTEGER, title VARCHAR, content VARCHAR, published BOOLEAN, "
+                                "created_at TIMESTAMP, PRIMARY KEY (id, created_at))"))
+        connection.execute(insert(models.Post), [
+            {"id": index, "title": f"Post number {index}", "content": "Lorem ipsum dolor sit amet " * 10,
+             "published": index % 2 == 0, "created_at": created_at}
+            for index in range(1, args.rows + 1)
+        ])
+
+    for name, respond in (("before", respond_before), ("after", respond_after)):
+        elapsed = measure(respond, engine, args.repeat)
+        print(f"{name:>6}: {elapsed * 1000:8.1f} ms per response, {elapsed / args.rows * 1e6:6.2f} us per row")
+
+
+if __name__ == "__main__":
+    main()
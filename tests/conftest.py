@@ -0,0 +1,7 @@
+import os
+
+# Settings has no defaults for these; the unit tests never connect to the db, so placeholders are enough
+for name, value in {"DB_USER": "chatterbox", "DB_PASSWORD": "chatterbox", "DB_NAME": "chatterbox",
+                    "DB_HOST": "localhost", "DB_PORT": "5432", "SECRET_KEY": "test-secret", "ALGORITHM": "HS256",
+                    "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "REFRESH_TOKEN_EXPIRE_DAYS": "7"}.items():
+    os.environ.setdefault(name, value)
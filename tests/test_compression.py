@@ -0,0 +1,93 @@
+import asyncio
+import zlib
+
+import brotli
+
+from app.middleware.compression import CompressionMiddleware, CompressionResponder, negotiate_encoding
+
+SUPPORTED = ("br", "gzip")
+
+
+def test_negotiate_picks_the_highest_weighted_supported_encoding():
+    assert negotiate_encoding("gzip, br", SUPPORTED) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", SUPPORTED) == "gzip"
+    assert negotiate_encoding("deflate, gzip", ("gzip",)) == "gzip"
+    assert negotiate_encoding("identity", SUPPORTED) is None
+    assert negotiate_encoding("", SUPPORTED) is None
+
+
+def test_negotiate_honours_refusals_and_wildcards():
+    assert negotiate_encoding("gzip;q=0", ("gzip",)) is None
+    assert negotiate_encoding("*;q=0.5, br;q=0", SUPPORTED) == "gzip"
+    assert negotiate_encoding("*", SUPPORTED) == "br"
+    assert negotiate_encoding("br;q=oops, gzip", SUPPORTED) == "gzip"
+
+
+def test_negotiate_reads_q_case_insensitively_among_other_parameters():
+    assert negotiate_encoding("gzip;Q=0", ("gzip",)) is None
+    assert negotiate_encoding("br;level=5;q=0, gzip", SUPPORTED) == "gzip"
+    assert negotiate_encoding("br ; level=5 ; Q = 0.2, gzip;q=0.1", SUPPORTED) == "br"
+
+
+def respond(encoding: str, messages: list, minimum_size: int = 100) -> list:
+    """Sends `messages` (start message first) through a CompressionResponder and returns what it sent on."""
+    sent = []
+
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = CompressionMiddleware(app, minimum_size=minimum_size)
+    responder = CompressionResponder(app, encoding, minimum_size, middleware._create_encoder)
+    asyncio.run(responder({"type": "http", "headers": []}, None, send))
+    return sent
+
+
+def start(content_type: str = "application/json", content_length: int | None = None) -> dict:
+    headers = [(b"content-type", content_type.encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    return {"type": "http.response.start", "status": 200, "headers": headers}
+
+
+def headers_of(message: dict) -> dict:
+    return {name.decode(): value.decode() for name, value in message["headers"]}
+
+
+def test_small_and_uncompressible_responses_pass_through():
+    small = b"{}"
+    sent = respond("gzip", [start(content_length=len(small)), {"type": "http.response.body", "body": small}])
+    assert "content-encoding" not in headers_of(sent[0])
+    assert sent[1]["body"] == small
+
+    image = b"\x89PNG" * 100
+    sent = respond("gzip", [start("image/png", len(image)), {"type": "http.response.body", "body": image}])
+    assert "content-encoding" not in headers_of(sent[0])
+    assert sent[1]["body"] == image
+
+
+def test_buffered_response_is_compressed_with_its_length():
+    body = b'{"title": "compressible"}' * 50
+    sent = respond("gzip", [start(content_length=len(body)), {"type": "http.response.body", "body": body}])
+    headers = headers_of(sent[0])
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(sent[1]["body"]) < len(body)
+    assert zlib.decompress(sent[1]["body"], 31) == body
+
+
+def test_streaming_response_is_compressed_and_flushed_chunk_by_chunk():
+    chunks = [b'{"title": "compressible"}' * 20 for _ in range(3)]
+    messages = [start()] + [{"type": "http.response.body", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.response.body", "body": b"", "more_body": False})
+    sent = respond("br", messages)
+    headers = headers_of(sent[0])
+    assert headers["content-encoding"] == "br"
+    assert "content-length" not in headers
+    bodies = [message["body"] for message in sent[1:]]
+    assert all(bodies[:3]), "every chunk is flushed as it arrives"
+    assert sent[-1]["more_body"] is False
+    assert brotli.decompress(b"".join(bodies)) == b"".join(chunks)
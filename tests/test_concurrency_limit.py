@@ -0,0 +1,118 @@
+import asyncio
+
+from app.middleware.concurrency_limit import (
+    AIMDLimit,
+    ConcurrencyLimitMiddleware,
+    exclude_from_latency,
+    mark_overloaded
+)
+
+
+def new_limit(**kwargs) -> AIMDLimit:
+    options = {"initial_limit": 20, "min_limit": 2, "max_limit": 200, "target_latency_seconds": 0.25}
+    return AIMDLimit(**{**options, **kwargs})
+
+
+def test_try_acquire_respects_priority_share():
+    limit = new_limit(initial_limit=10)
+    assert all(limit.try_acquire(0.5) for _ in range(5))
+    assert not limit.try_acquire(0.5)
+    assert limit.try_acquire(1.0)
+    assert limit.in_flight == 6
+
+
+def test_slow_request_backs_off_once_per_target_latency():
+    limit = new_limit()
+    for _ in range(2):
+        assert limit.try_acquire(1.0)
+    limit.release(1.0)
+    limit.release(1.0)
+    assert limit.limit == 18
+
+
+def test_overload_backs_off_regardless_of_latency():
+    limit = new_limit()
+    limit.try_acquire(1.0)
+    limit.release(0.01, overloaded=True)
+    assert limit.limit == 18
+
+
+def test_requests_without_latency_sample_do_not_change_the_limit():
+    limit = new_limit()
+    for _ in range(25):
+        limit.try_acquire(1.0)
+        limit.release(None)
+    assert limit.limit == 20
+    assert limit.in_flight == 0
+
+
+def test_limit_recovers_to_initial_limit_at_light_load():
+    limit = new_limit()
+    limit.try_acquire(1.0)
+    limit.release(1.0)
+    assert limit.limit == 18
+    for _ in range(100):
+        limit.try_acquire(1.0)
+        limit.release(0.01)
+    assert limit.limit >= 20
+    # but does not grow past it while mostly unused
+    for _ in range(100):
+        limit.try_acquire(1.0)
+        limit.release(0.01)
+    assert limit.limit < 21
+
+
+def test_limit_grows_while_in_use_and_stays_within_bounds():
+    limit = new_limit(initial_limit=4, max_limit=6)
+    for _ in range(500):
+        for _ in range(4):
+            limit.try_acquire(1.0)
+        for _ in range(4):
+            limit.release(0.01)
+    assert limit.limit == 6
+    limit = new_limit(initial_limit=4, min_limit=3, target_latency_seconds=0)
+    for _ in range(10):
+        limit.try_acquire(1.0)
+        limit.release(1.0)
+    assert limit.limit == 3
+
+
+def run_request(middleware: ConcurrencyLimitMiddleware, path: str, endpoint_action=None, status: int = 200) -> int:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def endpoint(scope, receive, send):
+        if endpoint_action:
+            endpoint_action(scope)
+        await asyncio.sleep(0.02)
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware.app = endpoint
+    scope = {"type": "http", "method": "POST", "path": path, "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    return statuses[0]
+
+
+def test_middleware_leaves_critical_and_exempt_requests_out_of_the_latency_signal():
+    middleware = ConcurrencyLimitMiddleware(None, initial_limit=20, target_latency_ms=1)
+    run_request(middleware, "/auth/login")
+    run_request(middleware, "/posts", exclude_from_latency)
+    assert middleware.limiter.limit == 20
+    run_request(middleware, "/posts")
+    assert middleware.limiter.limit == 18
+
+
+def test_middleware_backs_off_only_on_reported_overload():
+    middleware = ConcurrencyLimitMiddleware(None, initial_limit=20, target_latency_ms=1000)
+    # e.g. an application bug or the write-behind queue turning a request away
+    assert run_request(middleware, "/posts", status=503) == 503
+    assert middleware.limiter.limit == 20
+    run_request(middleware, "/posts", mark_overloaded, status=500)
+    assert middleware.limiter.limit < 20
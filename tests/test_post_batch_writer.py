@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from app.exceptions.custom_exceptions import InternalServerError, ServiceUnavailableException
+from app.schemas.post_model import PostModel, PostResponse
+from app.service import post_batch_writer as writer_module
+from app.service.post_batch_writer import PostBatchWriter
+
+
+def new_post(title: str) -> PostModel:
+    return PostModel(title=title, content="Some content")
+
+
+class FakeDb:
+    """Stands in for _insert_posts and _insert_posts_one_by_one, recording the batches they were called with."""
+
+    def __init__(self, failing_titles=(), delay: float = 0):
+        self.failing_titles = set(failing_titles)
+        self.delay = delay
+        self.batches: list[list[str]] = []
+        self.next_id = 0
+
+    def _row(self, post: PostModel) -> PostResponse:
+        self.next_id += 1
+        return PostResponse(id=self.next_id, title=post.title, content=post.content, published=post.published)
+
+    def insert_posts(self, posts):
+        self.batches.append([post.title for post in posts])
+        if self.delay:
+            time.sleep(self.delay)
+        if any(post.title in self.failing_titles for post in posts):
+            raise RuntimeError("batch rejected")
+        return [self._row(post) for post in posts]
+
+    def insert_posts_one_by_one(self, posts):
+        return [InternalServerError(reason="bad post") if post.title in self.failing_titles else self._row(post)
+                for post in posts]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(**kwargs) -> FakeDb:
+        db = FakeDb(**kwargs)
+        monkeypatch.setattr(writer_module, "_insert_posts", db.insert_posts)
+        monkeypatch.setattr(writer_module, "_insert_posts_one_by_one", db.insert_posts_one_by_one)
+        return db
+    return install
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=10))
+
+
+def test_posts_submitted_together_are_flushed_as_one_batch(fake_db):
+    db = fake_db()
+
+    async def scenario():
+        writer = PostBatchWriter(max_batch_size=10, flush_interval_ms=50, max_queue_size=100, enqueue_timeout_ms=100)
+        await writer.start()
+        results = await asyncio.gather(*(writer.submit(new_post(f"Post {i}")) for i in range(5)))
+        await writer.stop()
+        return results
+
+    results = run(scenario())
+    assert db.batches == [[f"Post {i}" for i in range(5)]]
+    assert [result.title for result in results] == [f"Post {i}" for i in range(5)]
+    assert len({result.id for result in results}) == 5
+
+
+def test_batch_is_flushed_when_full_without_waiting_for_the_deadline(fake_db):
+    db = fake_db()
+
+    async def scenario():
+        writer = PostBatchWriter(max_batch_size=3, flush_interval_ms=60_000, max_queue_size=100,
+                                 enqueue_timeout_ms=100)
+        await writer.start()
+        await asyncio.gather(*(writer.submit(new_post(f"Post {i}")) for i in range(6)))
+        await writer.stop()
+
+    run(scenario())
+    assert db.batches == [["Post 0", "Post 1", "Post 2"], ["Post 3", "Post 4", "Post 5"]]
+
+
+def test_failing_post_only_fails_its_own_request(fake_db):
+    db = fake_db(failing_titles={"Post 2"})
+
+    async def scenario():
+        writer = PostBatchWriter(max_batch_size=10, flush_interval_ms=50, max_queue_size=100, enqueue_timeout_ms=100)
+        await writer.start()
+        results = await asyncio.gather(*(writer.submit(new_post(f"Post {i}")) for i in range(4)),
+                                       return_exceptions=True)
+        await writer.stop()
+        return results
+
+    results = run(scenario())
+    assert len(db.batches) == 1
+    assert isinstance(results[2], InternalServerError)
+    assert [result.title for index, result in enumerate(results) if index != 2] == ["Post 0", "Post 1", "Post 3"]
+
+
+def test_full_queue_turns_callers_away(fake_db):
+    fake_db(delay=0.3)
+
+    async def scenario():
+        writer = PostBatchWriter(max_batch_size=1, flush_interval_ms=0, max_queue_size=1, enqueue_timeout_ms=50)
+        await writer.start()
+        # the first post is being written, the second fills the queue, the third cannot be queued in time
+        first = asyncio.create_task(writer.submit(new_post("Post 0")))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(writer.submit(new_post("Post 1")))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ServiceUnavailableException) as rejected:
+            await writer.submit(new_post("Post 2"))
+        await asyncio.gather(first, second)
+        await writer.stop()
+        return rejected.value
+
+    error = run(scenario())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
+
+
+def test_stopped_writer_rejects_posts(fake_db):
+    fake_db()
+
+    async def scenario():
+        writer = PostBatchWriter()
+        with pytest.raises(ServiceUnavailableException):
+            await writer.submit(new_post("Post 0"))
+
+    run(scenario())